@@ -0,0 +1,107 @@
+"""
+Daily sales series: grouping on DATE(created_at) vs the indexed created_day
+column used by time_buckets.py.
+
+Point DATABASE_URL at a scratch database (migrated) when seeding:
+
+    python bucket_benchmark.py --seed 2000000     # add 2M synthetic invoices first
+    python bucket_benchmark.py --days 30 --days 365
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, insert, select
+
+from main import IST, CustomerModel, InvoiceModel, get_engine
+from time_buckets import bucket_column, floor, gap_fill, range_filter
+
+SEED_CHUNK = 10000
+STATUSES = ("paid", "pending", "overdue", "cancelled")
+
+
+def seed(engine, count, days=730):
+    rng = random.Random(11)
+    now = datetime.now(IST).replace(tzinfo=None)
+    customer_id = str(uuid.uuid4())
+    with engine.begin() as conn:
+        conn.execute(insert(CustomerModel.__table__).values(
+            id=customer_id, name="Benchmark", email=f"bench-{customer_id[:8]}@example.com",
+            created_at=now,
+        ))
+    prefix = f"BENCH-{customer_id[:8]}"
+    for offset in range(0, count, SEED_CHUNK):
+        rows = []
+        for i in range(offset, min(offset + SEED_CHUNK, count)):
+            total = round(rng.uniform(50, 5000), 2)
+            rows.append({
+                "id": str(uuid.uuid4()),
+                "invoice_number": f"{prefix}-{i}",
+                "customer_id": customer_id,
+                "customer_name": "Benchmark",
+                "items": "[]",
+                "subtotal": total, "gst_amount": 0, "discount": 0, "total": total,
+                "payment_status": rng.choice(STATUSES),
+                "created_at": now - timedelta(seconds=rng.randrange(days * 86400)),
+            })
+        with engine.begin() as conn:
+            conn.execute(insert(InvoiceModel.__table__), rows)
+    print(f"seeded {count} invoices")
+
+
+def sums():
+    return [
+        func.sum(InvoiceModel.total),
+        func.sum(case((InvoiceModel.payment_status == "paid", InvoiceModel.total), else_=0)),
+    ]
+
+
+def expression_series(conn, start, end):
+    day = func.date(InvoiceModel.created_at)
+    return conn.execute(
+        select(day, *sums())
+        .where(InvoiceModel.created_at >= start, InvoiceModel.created_at < end)
+        .group_by(day)
+    ).all()
+
+
+def bucketed_series(conn, start, end):
+    bucket = bucket_column(InvoiceModel, "day", conn.dialect.name)
+    rows = conn.execute(
+        select(bucket, *sums()).where(range_filter(InvoiceModel, start, end)).group_by(bucket)
+    ).all()
+    return gap_fill(rows, start, end, "day", 2)
+
+
+def median_ms(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time daily chart queries")
+    parser.add_argument("--seed", type=int, default=0, help="insert this many synthetic invoices first")
+    parser.add_argument("--days", type=int, action="append", help="window length (repeatable)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = get_engine()
+    if args.seed:
+        seed(engine, args.seed)
+
+    with engine.connect() as conn:
+        total = conn.execute(select(func.count()).select_from(InvoiceModel.__table__)).scalar()
+        print(f"{total} invoices ({engine.dialect.name})")
+        end = floor(datetime.now(IST).replace(tzinfo=None), "day") + timedelta(days=1)
+        for days in args.days or [30, 365]:
+            start = end - timedelta(days=days)
+            old = median_ms(lambda: expression_series(conn, start, end), args.repeat)
+            new = median_ms(lambda: bucketed_series(conn, start, end), args.repeat)
+            print(f"{days:4d} days  DATE(created_at) {old:9.1f} ms   created_day {new:9.1f} ms   x{old / new:.1f}")
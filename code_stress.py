@@ -0,0 +1,79 @@
+"""
+Collision stress test for product code / SKU generation.
+
+Several processes (each with several threads, like uvicorn workers under
+load) draw product codes and SKUs concurrently - a mix of single codes
+(create_product) and batches (bulk import) - and the run fails if any value
+is handed out twice.
+
+    python code_stress.py                         # temp SQLite database
+    DATABASE_URL=mysql+pymysql://... python code_stress.py --processes 8
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/code_stress.db"
+
+
+def _thread_work(draws, batch, out):
+    from main import generate_product_code, generate_product_codes, generate_skus, new_session
+
+    db = new_session()
+    try:
+        for i in range(draws):
+            if i % 10 == 0:
+                out.extend(generate_product_codes(batch))
+                out.extend(generate_skus(db, batch))
+            else:
+                out.append(generate_product_code())
+                out.extend(generate_skus(db, 1))
+    finally:
+        db.close()
+
+
+def _process_work(threads, draws, batch, queue):
+    results = [[] for _ in range(threads)]
+    workers = [
+        threading.Thread(target=_thread_work, args=(draws, batch, results[t]))
+        for t in range(threads)
+    ]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    queue.put([code for result in results for code in result])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check generated codes never collide")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--draws", type=int, default=300, help="draws per thread")
+    parser.add_argument("--batch", type=int, default=200, help="codes per bulk draw")
+    args = parser.parse_args()
+
+    import migrations
+    migrations.migrate()
+
+    queue = multiprocessing.Queue()
+    start = time.perf_counter()
+    procs = [
+        multiprocessing.Process(target=_process_work, args=(args.threads, args.draws, args.batch, queue))
+        for _ in range(args.processes)
+    ]
+    for p in procs:
+        p.start()
+    codes = [code for _ in procs for code in queue.get()]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    duplicates = len(codes) - len(set(codes))
+    print(f"{len(codes)} codes in {elapsed:.2f} s ({len(codes) / elapsed:,.0f}/s), {duplicates} duplicates")
+    sys.exit(1 if duplicates or any(p.exitcode for p in procs) else 0)
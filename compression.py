@@ -0,0 +1,209 @@
+"""
+Response compression (Brotli when available, otherwise gzip).
+
+Same buffering/streaming behaviour as Starlette's GZipMiddleware, with a
+per-request choice of encoding from Accept-Encoding and a size threshold below
+which responses are sent as-is. Strong ETags get an encoding suffix
+(`"abc"` -> `"abc-br"`) since the compressed bytes are a different
+representation; use `etag_matches()` to compare If-None-Match against the
+uncompressed tag. A 304 gets back the variant the client holds, the same tag
+its 200 carried.
+
+Brotli is optional: without the `brotli` package only gzip is offered.
+"""
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+ENCODING_SUFFIXES = ("-br", "-gzip")
+
+
+class _GzipStream:
+    def __init__(self, level):
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip container
+
+    def compress(self, data):
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data=b""):
+        return self._z.compress(data) + self._z.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    def __init__(self, quality):
+        self._c = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self, data=b""):
+        return self._c.process(data) + self._c.finish()
+
+
+def choose_encoding(accept_encoding):
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, *params = (p.strip() for p in part.split(";"))
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if name and q > 0:
+            accepted.add(name.lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    bare = etag.strip('"')
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        for suffix in ENCODING_SUFFIXES:
+            if tag.endswith(suffix):
+                tag = tag[: -len(suffix)]
+                break
+        if tag == bare:
+            return True
+    return False
+
+
+def held_etag(if_none_match, etag, encoding):
+    """The encoding-suffixed `etag` the client sent, if any, else `etag`."""
+    if not if_none_match or not etag.endswith('"'):
+        return etag
+    variant = f'{etag[:-1]}-{encoding}"'
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == variant:
+            return variant
+    return etag
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size=1024, gzip_level=6, brotli_quality=4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("Accept-Encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(
+            self.app, send, encoding, self.minimum_size,
+            self.gzip_level if encoding == "gzip" else self.brotli_quality,
+            Headers(scope=scope).get("If-None-Match"),
+        )
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, app, send, encoding, minimum_size, level, if_none_match=None):
+        self.app = app
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.level = level
+        self.if_none_match = if_none_match
+        self.initial_message = {}
+        self.started = False
+        self.passthrough = False
+        self.stream = None
+
+    def _start_compressed(self, streaming):
+        self.stream = (
+            _BrotliStream(self.level) if self.encoding == "br" else _GzipStream(self.level)
+        )
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        if "accept-encoding" not in headers.get("vary", "").lower():
+            headers.add_vary_header("Accept-Encoding")
+        if "etag" in headers and headers["etag"].endswith('"'):
+            headers["ETag"] = f'{headers["etag"][:-1]}-{self.encoding}"'
+        if streaming:
+            del headers["Content-Length"]
+        return headers
+
+    async def send(self, message):
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            # Hold the headers until we know whether the body gets compressed
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] in (204, 304)
+                or headers.get("content-type", "").startswith("text/event-stream")
+            )
+            if message["status"] == 304 and "etag" in headers:
+                MutableHeaders(raw=message["headers"])["ETag"] = held_etag(
+                    self.if_none_match, headers["etag"], self.encoding
+                )
+            return
+
+        if message_type != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.passthrough:
+            if not self.started:
+                self.started = True
+                await self._send(self.initial_message)
+            await self._send(message)
+            return
+
+        if not self.started:
+            self.started = True
+
+            if len(body) < self.minimum_size and not more_body:
+                # Small payloads aren't worth the CPU or the headers
+                self.passthrough = True
+                await self._send(self.initial_message)
+                await self._send(message)
+                return
+
+            headers = self._start_compressed(streaming=more_body)
+            if more_body:
+                message["body"] = self.stream.compress(body)
+            else:
+                message["body"] = self.stream.finish(body)
+                headers["Content-Length"] = str(len(message["body"]))
+
+            await self._send(self.initial_message)
+            await self._send(message)
+            return
+
+        message["body"] = self.stream.compress(body) if more_body else self.stream.finish(body)
+        await self._send(message)
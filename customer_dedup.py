@@ -0,0 +1,161 @@
+"""
+Merge customers that share a phone number.
+
+Fills `phone_normalized` for rows that don't have it yet, then for every
+normalized phone with more than one customer keeps the oldest record, copies
+over any address it is missing, repoints `invoices.customer_id` to it
+(recounting its customer_metrics) and deletes the rest. Deletions are
+written to change_log so synced terminals drop them too.
+
+    python customer_dedup.py             # merge
+    python customer_dedup.py --dry-run   # only report what would be merged
+"""
+import argparse
+import logging
+
+from sqlalchemy import func, select, update
+
+from main import (
+    CustomerModel, InvoiceModel,
+    get_engine, normalize_phone, record_changes, bump_table_versions,
+    recompute_customer_metrics,
+)
+
+logger = logging.getLogger("customer_dedup")
+
+BATCH_SIZE = 1000
+
+customers = CustomerModel.__table__
+invoices = InvoiceModel.__table__
+
+
+def _merge_into(conn, keeper_id, duplicate_ids, metrics=True):
+    keeper_address = conn.execute(
+        select(customers.c.address).where(customers.c.id == keeper_id)
+    ).scalar()
+    if not keeper_address:
+        address = conn.execute(
+            select(customers.c.address)
+            .where(customers.c.id.in_(duplicate_ids), customers.c.address.isnot(None))
+            .order_by(customers.c.created_at)
+        ).scalar()
+        if address:
+            conn.execute(
+                update(customers).where(customers.c.id == keeper_id).values(address=address)
+            )
+
+    conn.execute(
+        update(invoices)
+        .where(invoices.c.customer_id.in_(duplicate_ids))
+        .values(customer_id=keeper_id)
+    )
+    if metrics:
+        # Keeper takes over the invoices; duplicates' metric rows go away
+        recompute_customer_metrics(conn, [keeper_id, *duplicate_ids])
+    conn.execute(customers.delete().where(customers.c.id.in_(duplicate_ids)))
+
+    record_changes(conn, "customers", duplicate_ids, op="delete")
+    record_changes(conn, "customers", [keeper_id])
+
+
+def backfill_normalized_phones(conn, batch_size=BATCH_SIZE, metrics=True):
+    """
+    Set phone_normalized where it's missing; returns rows updated.
+
+    A row whose phone is already held by another customer is merged on the
+    spot (older record wins), so this is safe with the unique index in place,
+    e.g. for rows written by workers that predate normalization.
+    """
+    updated = 0
+    last_id = ""
+    while True:
+        rows = conn.execute(
+            select(customers.c.id, customers.c.phone, customers.c.created_at)
+            .where(
+                customers.c.phone_normalized.is_(None),
+                customers.c.phone.isnot(None),
+                customers.c.id > last_id,
+            )
+            .order_by(customers.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return updated
+
+        for customer_id, phone, created_at in rows:
+            normalized = normalize_phone(phone)
+            if not normalized:
+                continue
+
+            holder = conn.execute(
+                select(customers.c.id, customers.c.created_at)
+                .where(customers.c.phone_normalized == normalized)
+            ).first()
+            if holder is not None and (holder.created_at, holder.id) <= (created_at, customer_id):
+                logger.info("%s: merging %s into %s", normalized, customer_id, holder.id)
+                _merge_into(conn, holder.id, [customer_id], metrics)
+            else:
+                if holder is not None:
+                    logger.info("%s: merging %s into %s", normalized, holder.id, customer_id)
+                    _merge_into(conn, customer_id, [holder.id], metrics)
+                conn.execute(
+                    update(customers)
+                    .where(customers.c.id == customer_id)
+                    .values(phone_normalized=normalized)
+                )
+            updated += 1
+        last_id = rows[-1].id
+
+
+def merge_duplicate_customers(conn, metrics=True):
+    """Returns (duplicate phone groups, customers removed)."""
+    phones = conn.execute(
+        select(customers.c.phone_normalized)
+        .where(customers.c.phone_normalized.isnot(None))
+        .group_by(customers.c.phone_normalized)
+        .having(func.count() > 1)
+    ).scalars().all()
+
+    removed = 0
+    for phone in phones:
+        group = conn.execute(
+            select(customers.c.id)
+            .where(customers.c.phone_normalized == phone)
+            .order_by(customers.c.created_at, customers.c.id)
+        ).all()
+        keeper, duplicates = group[0], group[1:]
+        duplicate_ids = [row.id for row in duplicates]
+        removed += len(duplicate_ids)
+
+        logger.info("%s: keeping %s, merging %d", phone, keeper.id, len(duplicate_ids))
+        _merge_into(conn, keeper.id, duplicate_ids, metrics)
+
+    return len(phones), removed
+
+
+def run(dry_run=False):
+    with get_engine().connect() as conn:
+        trans = conn.begin()
+        backfilled = backfill_normalized_phones(conn)
+        groups, removed = merge_duplicate_customers(conn)
+        # Dry run does the real work and throws it away, so counts are exact
+        if dry_run:
+            trans.rollback()
+        else:
+            trans.commit()
+
+    if (backfilled or removed) and not dry_run:
+        bump_table_versions(["customers"])
+
+    verb = "would merge" if dry_run else "merged"
+    logger.info(
+        "Backfilled %d phones; %s %d duplicate customers across %d phone numbers",
+        backfilled, verb, removed, groups,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge customers sharing a phone number")
+    parser.add_argument("--dry-run", action="store_true", help="report only, change nothing")
+    args = parser.parse_args()
+    run(dry_run=args.dry_run)
@@ -0,0 +1,50 @@
+"""
+Rebuild customer_metrics from the invoices table.
+
+The invoice.created outbox handler and update_invoice_status keep the metrics
+current; run this after bulk invoice edits or imports that bypass the API, or to repair drift.
+Customers are processed in id batches, one short transaction each.
+
+    python customer_metrics.py
+"""
+import argparse
+import logging
+
+from sqlalchemy import select
+
+from main import CustomerModel, get_engine, recompute_customer_metrics
+
+logger = logging.getLogger("customer_metrics")
+
+BATCH_SIZE = 1000
+
+customers = CustomerModel.__table__
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    engine = get_engine()
+    rebuilt = 0
+    last_id = ""
+    while True:
+        with engine.begin() as conn:
+            ids = conn.execute(
+                select(customers.c.id)
+                .where(customers.c.id > last_id)
+                .order_by(customers.c.id)
+                .limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            recompute_customer_metrics(conn, ids)
+        rebuilt += len(ids)
+        last_id = ids[-1]
+
+    logger.info("Rebuilt metrics for %d customers", rebuilt)
+    return rebuilt
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild per-customer invoice metrics")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    rebuild(batch_size=args.batch_size)
@@ -0,0 +1,62 @@
+"""
+Streaming CSV / NDJSON encoding for the export endpoints.
+
+`iter_export()` turns an iterator of records (tuples in `fields` order) into
+byte chunks of roughly `chunk_records` records each, so a StreamingResponse
+fed from a `yield_per` query holds one chunk in memory however large the
+export is. Datetimes are written as ISO-8601 in both formats.
+"""
+import csv
+import io
+from datetime import date, datetime
+
+from serializers import dumps
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+CHUNK_RECORDS = 1000
+
+
+def _csv_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _iter_csv(records, fields, chunk_records):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    pending = 0
+    for record in records:
+        writer.writerow([_csv_value(v) for v in record])
+        pending += 1
+        if pending >= chunk_records:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode()
+
+
+def _iter_ndjson(records, fields, chunk_records):
+    lines = []
+    for record in records:
+        lines.append(dumps(dict(zip(fields, record))))
+        if len(lines) >= chunk_records:
+            lines.append(b"")
+            yield b"\n".join(lines)
+            lines = []
+    if lines:
+        lines.append(b"")
+        yield b"\n".join(lines)
+
+
+def iter_export(records, fields, fmt, chunk_records=CHUNK_RECORDS):
+    if fmt == "csv":
+        return _iter_csv(records, fields, chunk_records)
+    if fmt == "ndjson":
+        return _iter_ndjson(records, fields, chunk_records)
+    raise ValueError(f"Unknown export format: {fmt}")
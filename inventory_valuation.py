@@ -0,0 +1,467 @@
+"""
+FIFO / weighted-average inventory valuation from the ledger.
+
+Replays inventory_transactions oldest first, streamed in chunks, through a
+per-product book:
+
+    fifo     cost layers [quantity, unit cost]; issues consume the oldest
+    average  running quantity and value; issues go out at the current average
+
+IN rows are received at their `unit_cost` (falling back to the product's
+current cost_price for rows written before unit costs were recorded). Stock a
+product had before its first ledger row is an opening layer at the product's
+creation. When a row's stock_before disagrees with the book (stock edited
+outside the ledger), or an issue exceeds it, the difference is booked first
+as an adjustment at the current cost_price, so the book never goes negative.
+
+Memory is bounded by products x open layers, not by ledger size. Per month:
+opening/closing quantity and value, inward value, COGS (INVOICE issues),
+other issues (outward, stock corrections) and adjustments.
+
+Run nightly with --snapshot to store, for each closed month, the books as of
+the month start and the finished month's row (valuation_snapshots). Reports
+then take whole stored months as they are and replay only the ledger after
+the latest usable snapshot, instead of from the beginning of time.
+
+    python inventory_valuation.py --year 2025
+    python inventory_valuation.py --method average --from 2025-04-01 --to 2026-03-31
+    python inventory_valuation.py --snapshot            # nightly, both methods
+"""
+import argparse
+import logging
+import time
+from collections import deque
+from datetime import date, datetime, timedelta
+from heapq import merge
+
+from sqlalchemy import func, select
+
+from main import (
+    IST, InventoryTransaction, ProductModel, ValuationSnapshot, ValuationSnapshotItem,
+    dumps, get_engine, loads,
+)
+from time_buckets import floor, step
+
+logger = logging.getLogger("inventory_valuation")
+
+METHODS = ("fifo", "average")
+CHUNK_ROWS = 10000
+INSERT_CHUNK = 1000
+# A month is snapshotted once it has been closed this long
+SNAPSHOT_GRACE = timedelta(days=1)
+
+products = ProductModel.__table__
+ledger = InventoryTransaction.__table__
+snapshots = ValuationSnapshot.__table__
+snapshot_items = ValuationSnapshotItem.__table__
+
+
+class FifoBook:
+    def __init__(self):
+        self.layers = {}  # product id -> deque of [quantity, unit cost]
+        self.on_hand = {}
+
+    def quantity(self, pid):
+        return self.on_hand.get(pid, 0)
+
+    def receive(self, pid, qty, cost):
+        self.on_hand[pid] = self.on_hand.get(pid, 0) + qty
+        layers = self.layers.setdefault(pid, deque())
+        if layers and layers[-1][1] == cost:
+            layers[-1][0] += qty
+        else:
+            layers.append([qty, cost])
+
+    def dump(self):
+        """(product id, quantity, value, layers JSON) per product in stock."""
+        for pid, layers in self.layers.items():
+            if layers:
+                value = sum(qty * cost for qty, cost in layers)
+                yield pid, self.on_hand[pid], value, dumps([list(layer) for layer in layers]).decode()
+
+    def load(self, pid, qty, value, layers):
+        self.on_hand[pid] = qty
+        self.layers[pid] = deque([list(layer) for layer in loads(layers)])
+
+    def issue(self, pid, qty):
+        """Remove qty (<= quantity on hand) units; returns their cost."""
+        self.on_hand[pid] -= qty
+        layers = self.layers[pid]
+        value = 0.0
+        while qty:
+            layer = layers[0]
+            taken = min(qty, layer[0])
+            value += taken * layer[1]
+            qty -= taken
+            layer[0] -= taken
+            if not layer[0]:
+                layers.popleft()
+        return value
+
+
+class AverageBook:
+    def __init__(self):
+        self.books = {}  # product id -> [quantity, value]
+
+    def quantity(self, pid):
+        book = self.books.get(pid)
+        return book[0] if book else 0
+
+    def dump(self):
+        for pid, (qty, value) in self.books.items():
+            if qty:
+                yield pid, qty, value, None
+
+    def load(self, pid, qty, value, layers):
+        self.books[pid] = [qty, value]
+
+    def receive(self, pid, qty, cost):
+        book = self.books.setdefault(pid, [0, 0.0])
+        book[0] += qty
+        book[1] += qty * cost
+
+    def issue(self, pid, qty):
+        """Remove qty (<= quantity on hand) units; returns their cost."""
+        book = self.books[pid]
+        value = qty * book[1] / book[0]
+        book[0] -= qty
+        book[1] = book[1] - value if book[0] else 0.0
+        return value
+
+
+BOOKS = {"fifo": FifoBook, "average": AverageBook}
+
+
+def month_key(moment):
+    return moment.year * 12 + moment.month - 1
+
+
+def month_label(key):
+    return f"{key // 12:04d}-{key % 12 + 1:02d}"
+
+
+def _catalog(conn):
+    """(id, cost_price, created_at, opening stock) per product."""
+    first_row = (
+        select(ledger.c.stock_before)
+        .where(ledger.c.product_id == products.c.id)
+        .order_by(ledger.c.created_at, ledger.c.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    return conn.execute(
+        select(
+            products.c.id, products.c.cost_price, products.c.created_at,
+            func.coalesce(first_row, products.c.stock),
+        )
+    ).all()
+
+
+def _events(conn, catalog, start_at, window_to, chunk_rows):
+    """Opening stock and ledger rows in [start_at, window_to), merged in time order."""
+    start_at = start_at or datetime.min
+    openings = sorted(
+        (created_at or datetime.min, "", pid, "OPEN", qty, None, None, None)
+        for pid, _, created_at, qty in catalog
+        if qty and qty > 0 and start_at <= (created_at or datetime.min) < window_to
+    )
+    result = conn.execution_options(yield_per=chunk_rows).execute(
+        select(
+            ledger.c.created_at, ledger.c.id, ledger.c.product_id, ledger.c.type,
+            ledger.c.quantity, ledger.c.unit_cost, ledger.c.source, ledger.c.stock_before,
+        )
+        .where(
+            ledger.c.created_at >= start_at,
+            ledger.c.created_at < window_to,
+            ledger.c.product_id.isnot(None),
+        )
+        .order_by(ledger.c.created_at, ledger.c.id)
+    )
+    rows = (tuple(row) for chunk in result.partitions() for row in chunk)
+    return merge(openings, rows, key=lambda event: (event[0], event[1]))
+
+
+def _new_period(key, qty, value):
+    return {
+        "period": month_label(key),
+        "opening_qty": qty, "opening_value": value,
+        "inward_qty": 0, "inward_value": 0.0,
+        "cogs": 0.0, "other_out_value": 0.0, "out_qty": 0,
+        "adjustment_value": 0.0,
+    }
+
+
+def _close_period(period, qty, value):
+    period["closing_qty"] = qty
+    period["closing_value"] = value
+    for key, amount in period.items():
+        if isinstance(amount, float):
+            period[key] = round(amount, 2)
+    return period
+
+
+def _load_snapshot(conn, method, as_of):
+    book = BOOKS[method]()
+    total_qty, total_value = 0, 0.0
+    rows = conn.execution_options(yield_per=CHUNK_ROWS).execute(
+        select(
+            snapshot_items.c.product_id, snapshot_items.c.quantity,
+            snapshot_items.c.value, snapshot_items.c.layers,
+        ).where(snapshot_items.c.method == method, snapshot_items.c.as_of == as_of)
+    )
+    for pid, qty, value, layers in rows:
+        book.load(pid, qty, value, layers)
+        total_qty += qty
+        total_value += value
+    return book, total_qty, total_value
+
+
+def _stored_chain(conn, method, window_from, window_to):
+    """
+    Stored rows for the first run of consecutive whole months inside the
+    window: (periods, run start, run end).
+    """
+    periods, run_from, run_to = [], None, None
+    for as_of, period in conn.execute(
+        select(snapshots.c.as_of, snapshots.c.period)
+        .where(snapshots.c.method == method, snapshots.c.as_of > window_from, snapshots.c.as_of <= window_to)
+        .order_by(snapshots.c.as_of)
+    ):
+        month_from = floor(as_of - timedelta(days=1), "month")
+        if run_to is None:
+            if month_from < window_from:
+                continue  # window starts mid-month
+            run_from = month_from
+        elif month_from != run_to:
+            break
+        periods.append(loads(period))
+        run_to = as_of
+    return periods, run_from, run_to
+
+
+def _latest_snapshot(conn, method, moment):
+    return conn.execute(
+        select(func.max(snapshots.c.as_of))
+        .where(snapshots.c.method == method, snapshots.c.as_of <= moment)
+    ).scalar()
+
+
+def value_inventory(conn, window_from, window_to, method="fifo", chunk_rows=CHUNK_ROWS, use_snapshots=True):
+    """
+    Monthly valuation for naive datetimes [window_from, window_to). Returns
+    {"method", "periods": [...], "totals": {...}}.
+    """
+    return _value(conn, window_from, window_to, method, chunk_rows, use_snapshots)[0]
+
+
+def _value(conn, window_from, window_to, method, chunk_rows, use_snapshots):
+    """
+    value_inventory, plus the book as of window_to. With snapshots: the
+    stored months inside the window as they are, and replays only for the
+    part before them (from the latest snapshot before the window) and after.
+    """
+    if method not in BOOKS:
+        raise ValueError(f"Unknown valuation method: {method}")
+    catalog = _catalog(conn)
+    stored, run_from, run_to = (
+        _stored_chain(conn, method, window_from, window_to) if use_snapshots else ([], None, None)
+    )
+
+    head_to = run_from if stored else window_to
+    start_at = _latest_snapshot(conn, method, window_from) if use_snapshots else None
+    if start_at is not None:
+        book, total_qty, total_value = _load_snapshot(conn, method, start_at)
+    else:
+        book, total_qty, total_value = BOOKS[method](), 0, 0.0
+
+    periods = []
+    if window_from < head_to:
+        periods, total_qty, total_value = _replay(
+            conn, book, total_qty, total_value, catalog, start_at, window_from, head_to, chunk_rows
+        )
+    if stored:
+        periods += stored
+        book, total_qty, total_value = _load_snapshot(conn, method, run_to)
+        if run_to < window_to:
+            tail, total_qty, total_value = _replay(
+                conn, book, total_qty, total_value, catalog, run_to, run_to, window_to, chunk_rows
+            )
+            periods += tail
+
+    totals = {
+        key: round(sum(p[key] for p in periods), 2)
+        for key in ("inward_qty", "inward_value", "out_qty", "cogs", "other_out_value", "adjustment_value")
+    }
+    totals.update(
+        opening_value=periods[0]["opening_value"],
+        closing_qty=periods[-1]["closing_qty"],
+        closing_value=periods[-1]["closing_value"],
+    )
+    return {"method": method, "periods": periods, "totals": totals}, book
+
+
+def _replay(conn, book, total_qty, total_value, catalog, start_at, window_from, window_to, chunk_rows):
+    """
+    Apply events from start_at (None: the beginning) to window_to to `book`.
+    Returns (periods for [window_from, window_to), closing qty, closing value).
+    """
+    fallback = {pid: cost or 0.0 for pid, cost, _, _ in catalog}
+    first_key = month_key(window_from)
+    last_key = month_key(window_to - timedelta(microseconds=1))
+    periods = []
+    current, current_key = None, first_key
+
+    for created_at, _, pid, kind, qty, unit_cost, source, stock_before in _events(
+        conn, catalog, start_at, window_to, chunk_rows
+    ):
+        in_window = created_at >= window_from
+        if in_window:
+            # Months with no movement still get a row (opening == closing)
+            if current is None:
+                current = _new_period(current_key, total_qty, total_value)
+            while current_key < month_key(created_at):
+                periods.append(_close_period(current, total_qty, total_value))
+                current_key += 1
+                current = _new_period(current_key, total_qty, total_value)
+        cost = fallback.get(pid, 0.0)
+
+        if kind != "OPEN":
+            # Stock edited outside the ledger, or issued without a receipt
+            on_hand = book.quantity(pid)
+            drift = (stock_before if stock_before is not None else on_hand) - on_hand
+            if kind == "OUT" and qty:
+                drift = max(drift, qty - on_hand)
+            if drift:
+                if drift > 0:
+                    book.receive(pid, drift, cost)
+                    change = drift * cost
+                else:
+                    change = -book.issue(pid, -drift)
+                total_qty += drift
+                total_value += change
+                if in_window:
+                    current["adjustment_value"] += change
+
+        if not qty:
+            continue
+        if kind in ("OPEN", "IN"):
+            unit = unit_cost if unit_cost is not None else cost
+            book.receive(pid, qty, unit)
+            total_qty += qty
+            total_value += qty * unit
+            if in_window:
+                current["inward_qty"] += qty
+                current["inward_value"] += qty * unit
+        elif kind == "OUT":
+            value = book.issue(pid, qty)
+            total_qty -= qty
+            total_value -= value
+            if in_window:
+                current["out_qty"] += qty
+                current["cogs" if source == "INVOICE" else "other_out_value"] += value
+
+    if current is None:
+        current = _new_period(current_key, total_qty, total_value)
+    while current_key < last_key:
+        periods.append(_close_period(current, total_qty, total_value))
+        current_key += 1
+        current = _new_period(current_key, total_qty, total_value)
+    periods.append(_close_period(current, total_qty, total_value))
+    return periods, total_qty, total_value
+
+
+def snapshot(engine, method, chunk_rows=CHUNK_ROWS):
+    """
+    Store the book as of every month start not yet snapshotted, up to the
+    last month closed for at least SNAPSHOT_GRACE. Each month replays from
+    the previous snapshot, in its own transaction. Returns months written.
+    """
+    now = datetime.now(IST).replace(tzinfo=None)
+    last_closed = floor(now - SNAPSHOT_GRACE, "month")
+    with engine.connect() as conn:
+        last = conn.execute(
+            select(func.max(snapshots.c.as_of)).where(snapshots.c.method == method)
+        ).scalar()
+        if last is None:
+            first = min(
+                (moment for moment in (
+                    conn.execute(select(func.min(ledger.c.created_at))).scalar(),
+                    conn.execute(select(func.min(products.c.created_at))).scalar(),
+                ) if moment is not None),
+                default=None,
+            )
+            if first is None:
+                return 0
+            last = floor(first, "month")
+
+    written = 0
+    as_of = step(last, "month")
+    while as_of <= last_closed:
+        started = time.perf_counter()
+        month_from = floor(as_of - timedelta(days=1), "month")
+        with engine.begin() as conn:
+            report, book = _value(conn, month_from, as_of, method, chunk_rows, use_snapshots=True)
+            conn.execute(snapshots.insert().values(
+                method=method, as_of=as_of, period=dumps(report["periods"][-1]).decode(), computed_at=now,
+            ))
+            items = [
+                {"method": method, "as_of": as_of, "product_id": pid, "quantity": qty,
+                 "value": round(value, 6), "layers": layers}
+                for pid, qty, value, layers in book.dump()
+            ]
+            for i in range(0, len(items), INSERT_CHUNK):
+                conn.execute(snapshot_items.insert(), items[i:i + INSERT_CHUNK])
+        logger.info("%s snapshot %s: %d products, %.2f s", method, f"{as_of:%Y-%m-%d}", len(items),
+                    time.perf_counter() - started)
+        written += 1
+        as_of = step(as_of, "month")
+    return written
+
+
+def drop_snapshots(engine, method):
+    with engine.begin() as conn:
+        conn.execute(snapshot_items.delete().where(snapshot_items.c.method == method))
+        conn.execute(snapshots.delete().where(snapshots.c.method == method))
+
+
+def window(year=None, start=None, end=None):
+    """Naive [from, to) for a calendar year or start/end dates (end inclusive)."""
+    today = datetime.now(IST).date()
+    if year:
+        start, end = date(year, 1, 1), date(year, 12, 31)
+    start = start or date(today.year, 1, 1)
+    end = end or today
+    return datetime.combine(start, datetime.min.time()), datetime.combine(end + timedelta(days=1), datetime.min.time())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monthly FIFO / weighted-average inventory valuation")
+    parser.add_argument("--method", choices=METHODS, default="fifo")
+    parser.add_argument("--year", type=int, help="calendar year (default: this year to date)")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat)
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, help="inclusive")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--snapshot", action="store_true", help="store month-start snapshots (both methods)")
+    parser.add_argument("--rebuild", action="store_true", help="with --snapshot: recompute all snapshots")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        engine = get_engine()
+        for snapshot_method in METHODS:
+            if args.rebuild:
+                drop_snapshots(engine, snapshot_method)
+            snapshot(engine, snapshot_method, args.chunk_rows)
+        raise SystemExit(0)
+
+    window_from, window_to = window(args.year, args.start, args.end)
+    started = time.perf_counter()
+    with get_engine().connect() as conn:
+        report = value_inventory(conn, window_from, window_to, args.method, args.chunk_rows)
+
+    print(f"{'period':8} {'opening':>14} {'inward':>14} {'cogs':>14} {'other out':>12} {'adjust':>10} {'closing':>14}")
+    for p in report["periods"]:
+        print(
+            f"{p['period']:8} {p['opening_value']:14,.2f} {p['inward_value']:14,.2f} {p['cogs']:14,.2f} "
+            f"{p['other_out_value']:12,.2f} {p['adjustment_value']:10,.2f} {p['closing_value']:14,.2f}"
+        )
+    logger.info("%s valuation in %.2f s", args.method, time.perf_counter() - started)
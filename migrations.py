@@ -0,0 +1,398 @@
+"""
+Versioned schema migrations.
+
+Every schema change (new tables, columns, indexes) is a numbered step in
+MIGRATIONS. Applied versions are recorded in `schema_migrations`, so each step
+runs exactly once per database:
+
+    python migrations.py            # apply pending migrations
+    python migrations.py --status   # list applied / pending versions
+    python migrations.py --check    # exit 1 if anything is pending (deploy gate)
+
+The API never runs DDL itself: run this once per deploy, before (re)starting
+the uvicorn workers. Steps must be idempotent (check before create) so they
+are safe on databases that were originally built with `create_all`.
+"""
+import argparse
+import logging
+import sys
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import (
+    JSON, Column, DateTime, Float, ForeignKey, Integer, MetaData, String, Table, Text,
+    func, inspect, select, text,
+)
+from sqlalchemy.schema import CreateColumn
+
+from main import (
+    CHANGE_SEQ_COUNTER, IST, get_engine, VERSIONED_TABLES, recompute_customer_metrics,
+    ChangeLog, CodeCounter, CustomerMetrics, CustomerModel, IdempotencyKey, InventoryTransaction,
+    InvoiceModel, OutboxEvent, ProductClassification, ProductForecast, ProductModel, SalesDaily,
+    TableVersion, ValuationSnapshot, ValuationSnapshotItem,
+)
+
+logger = logging.getLogger("migrations")
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+# ---------------- FROZEN SCHEMAS ----------------
+# Tables as the step that creates them left them. The models in main.py are
+# the *latest* schema; building a step from them would create later steps'
+# columns and indexes early. Don't edit these: add a new step instead.
+baseline_metadata = MetaData()
+
+Table(
+    "users", baseline_metadata,
+    Column("id", String, primary_key=True, index=True),
+    Column("email", String, unique=True, index=True, nullable=False),
+    Column("name", String, nullable=False),
+    Column("password", String, nullable=False),
+    Column("role", String, nullable=False),
+    Column("created_at", DateTime(timezone=True)),
+)
+
+Table(
+    "categories", baseline_metadata,
+    Column("id", String(36), primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("description", Text, nullable=True),
+    Column("created_at", DateTime),
+)
+
+Table(
+    "products", baseline_metadata,
+    Column("id", String(36), primary_key=True),
+    Column("product_code", String(50), nullable=False, unique=True, index=True),
+    Column("name", String(255), nullable=False),
+    Column("description", Text, nullable=True),
+    Column("category_id", String(36), ForeignKey("categories.id"), nullable=False),
+    Column("cost_price", Float, nullable=False),
+    Column("min_selling_price", Float, nullable=False),
+    Column("selling_price", Float, nullable=False),
+    Column("qr_code_url", String(255), nullable=True),
+    Column("images", JSON, nullable=True),
+    Column("stock", Integer, nullable=False),
+    Column("min_stock", Integer, nullable=False),
+    Column("sku", String(100), nullable=False, unique=True),
+    Column("image_url", String(500), nullable=True),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+)
+
+Table(
+    "inventory_transactions", baseline_metadata,
+    Column("id", String(36), primary_key=True),
+    Column("product_id", String(36), ForeignKey("products.id")),
+    Column("type", String(3)),
+    Column("quantity", Integer),
+    Column("source", String(50)),
+    Column("reason", String(255)),
+    Column("created_by", String(36)),
+    Column("created_at", DateTime),
+    Column("stock_before", Integer, nullable=False),
+    Column("stock_after", Integer, nullable=False),
+)
+
+Table(
+    "customers", baseline_metadata,
+    Column("id", String(36), primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("email", String(255), nullable=False),
+    Column("phone", String(50), nullable=True),
+    Column("address", Text, nullable=True),
+    Column("created_at", DateTime),
+)
+
+Table(
+    "invoices", baseline_metadata,
+    Column("id", String(36), primary_key=True),
+    Column("invoice_number", String(50), nullable=False, unique=True, index=True),
+    Column("customer_id", String(36), ForeignKey("customers.id"), nullable=False),
+    Column("customer_name", String(255), nullable=False),
+    Column("customer_phone", String(50), nullable=True),
+    Column("customer_address", Text, nullable=True),
+    Column("items", Text, nullable=False),
+    Column("subtotal", Float, nullable=False),
+    Column("gst_amount", Float, nullable=False),
+    Column("discount", Float, nullable=False),
+    Column("total", Float, nullable=False),
+    Column("payment_status", String(50), nullable=False),
+    Column("created_at", DateTime),
+)
+
+# 0004; `seq` and its indexes come with 0016
+change_log_v4 = Table(
+    "change_log", MetaData(),
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("table_name", String(50), nullable=False),
+    Column("row_id", String(36), nullable=False),
+    Column("op", String(6), nullable=False),
+    Column("created_at", DateTime, nullable=False),
+)
+
+
+# ---------------- HELPERS ----------------
+def _index_names(conn, table_name):
+    # Read the catalog directly: reflection skips expression-based indexes
+    if conn.dialect.name == "sqlite":
+        rows = conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t"),
+            {"t": table_name},
+        )
+    else:
+        rows = conn.execute(
+            text(
+                "SELECT DISTINCT index_name FROM information_schema.statistics "
+                "WHERE table_schema = DATABASE() AND table_name = :t"
+            ),
+            {"t": table_name},
+        )
+    return {row[0] for row in rows}
+
+
+def create_index_if_missing(conn, index):
+    if index.name in _index_names(conn, index.table.name):
+        logger.info("  index %s already exists", index.name)
+        return
+    logger.info("  creating index %s", index.name)
+    index.create(bind=conn)
+
+
+def add_column_if_missing(conn, model, column_name):
+    table_name = model.__tablename__
+    existing = {col["name"] for col in inspect(conn).get_columns(table_name)}
+    if column_name in existing:
+        logger.info("  column %s.%s already exists", table_name, column_name)
+        return
+    column = model.__table__.columns[column_name]
+    ddl = CreateColumn(column).compile(dialect=conn.dialect)
+    logger.info("  adding column %s.%s", table_name, column_name)
+    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {ddl}"))
+
+
+def _model_index(model, name):
+    for index in model.__table__.indexes:
+        if index.name == name:
+            return index
+    raise KeyError(f"{model.__tablename__} has no index {name}")
+
+
+# ---------------- MIGRATIONS ----------------
+def m0001_initial_schema(conn):
+    # The tables the app shipped with (no-op on live DBs); later steps add
+    # everything since
+    baseline_metadata.create_all(bind=conn, checkfirst=True)
+
+
+def m0002_hot_query_indexes(conn):
+    for model, name in [
+        (InvoiceModel, "ix_invoices_status_created"),
+        (InvoiceModel, "ix_invoices_created"),
+        (InventoryTransaction, "ix_inventory_transactions_type_created"),
+        (InventoryTransaction, "ix_inventory_transactions_product_created"),
+        (InventoryTransaction, "ix_inventory_transactions_created"),
+        (CustomerModel, "ix_customers_phone"),
+        (ProductModel, "ix_products_stock_gap"),
+    ]:
+        create_index_if_missing(conn, _model_index(model, name))
+
+
+def m0003_table_versions(conn):
+    TableVersion.__table__.create(bind=conn, checkfirst=True)
+    existing = {row[0] for row in conn.execute(TableVersion.__table__.select())}
+    for name in VERSIONED_TABLES:
+        if name not in existing:
+            conn.execute(TableVersion.__table__.insert().values(name=name, version=0))
+
+
+def m0004_change_log(conn):
+    change_log_v4.create(bind=conn, checkfirst=True)
+
+    # Seed the feed with every existing row so cursor=0 yields a full replica.
+    # Backdated so the rows are served immediately.
+    seeded_at = datetime.now(IST).replace(tzinfo=None) - timedelta(hours=1)
+    for name in VERSIONED_TABLES:
+        conn.execute(
+            text(
+                f"INSERT INTO change_log (table_name, row_id, op, created_at) "
+                f"SELECT :name, id, 'upsert', :at FROM {name}"
+            ),
+            {"name": name, "at": seeded_at},
+        )
+
+
+def m0005_normalized_customer_phones(conn):
+    # Imported here: customer_dedup imports main, same as this module
+    from customer_dedup import backfill_normalized_phones, merge_duplicate_customers
+
+    add_column_if_missing(conn, CustomerModel, "phone_normalized")
+    # customer_metrics doesn't exist yet at this version; 0007 builds it
+    backfill_normalized_phones(conn, metrics=False)
+    groups, removed = merge_duplicate_customers(conn, metrics=False)
+    logger.info("  merged %d remaining duplicate customers across %d phone numbers", removed, groups)
+    conn.execute(
+        TableVersion.__table__.update()
+        .where(TableVersion.name == "customers")
+        .values(version=TableVersion.version + 1)
+    )
+    create_index_if_missing(conn, _model_index(CustomerModel, "uq_customers_phone_normalized"))
+
+
+def m0006_customer_keyset_indexes(conn):
+    for name in ("ix_customers_name_id", "ix_customers_email_id"):
+        create_index_if_missing(conn, _model_index(CustomerModel, name))
+
+
+def m0007_customer_metrics(conn):
+    CustomerMetrics.__table__.create(bind=conn, checkfirst=True)
+    recompute_customer_metrics(conn)
+
+
+def m0008_idempotency_keys(conn):
+    IdempotencyKey.__table__.create(bind=conn, checkfirst=True)
+
+
+def m0009_outbox_events(conn):
+    OutboxEvent.__table__.create(bind=conn, checkfirst=True)
+
+
+def m0010_code_counters(conn):
+    CodeCounter.__table__.create(bind=conn, checkfirst=True)
+
+
+def m0011_product_forecasts(conn):
+    ProductForecast.__table__.create(bind=conn, checkfirst=True)
+
+
+def m0012_product_classifications(conn):
+    ProductClassification.__table__.create(bind=conn, checkfirst=True)
+
+
+def m0013_ledger_unit_cost(conn):
+    add_column_if_missing(conn, InventoryTransaction, "unit_cost")
+
+
+def m0014_created_day_buckets(conn):
+    # Generated (virtual) columns: existing rows need no backfill
+    for model, index in [
+        (InvoiceModel, "ix_invoices_day_status_total"),
+        (InventoryTransaction, "ix_inventory_transactions_day_type_qty"),
+    ]:
+        add_column_if_missing(conn, model, "created_day")
+        create_index_if_missing(conn, _model_index(model, index))
+
+
+def m0015_sales_daily(conn):
+    # Filled by sales_rollup.py; until then the series endpoint reads invoices
+    SalesDaily.__table__.create(bind=conn, checkfirst=True)
+
+
+def m0016_change_log_seq(conn):
+    add_column_if_missing(conn, ChangeLog, "seq")
+    # Existing entries keep their id as seq, so terminals' cursors stay valid
+    log, counters = ChangeLog.__table__, CodeCounter.__table__
+    conn.execute(log.update().where(log.c.seq.is_(None)).values(seq=log.c.id))
+    last = conn.execute(select(func.coalesce(func.max(log.c.seq), 0))).scalar()
+    if not conn.execute(
+        counters.update().where(counters.c.name == CHANGE_SEQ_COUNTER).values(value=last)
+    ).rowcount:
+        conn.execute(counters.insert().values(name=CHANGE_SEQ_COUNTER, value=last))
+    for name in ("uq_change_log_seq", "ix_change_log_row_seq"):
+        create_index_if_missing(conn, _model_index(ChangeLog, name))
+
+
+def m0017_valuation_snapshots(conn):
+    # Filled by inventory_valuation.py --snapshot; until then reports replay
+    for model in (ValuationSnapshot, ValuationSnapshotItem):
+        model.__table__.create(bind=conn, checkfirst=True)
+
+
+MIGRATIONS = [
+    (1, "initial schema", m0001_initial_schema),
+    (2, "hot query indexes", m0002_hot_query_indexes),
+    (3, "table change versions", m0003_table_versions),
+    (4, "change log for delta sync", m0004_change_log),
+    (5, "normalized, unique customer phones", m0005_normalized_customer_phones),
+    (6, "customer keyset pagination indexes", m0006_customer_keyset_indexes),
+    (7, "customer lifetime metrics", m0007_customer_metrics),
+    (8, "idempotency keys for retried writes", m0008_idempotency_keys),
+    (9, "outbox events", m0009_outbox_events),
+    (10, "product code / SKU counters", m0010_code_counters),
+    (11, "reorder point forecasts", m0011_product_forecasts),
+    (12, "ABC/XYZ product classifications", m0012_product_classifications),
+    (13, "unit cost on inventory transactions", m0013_ledger_unit_cost),
+    (14, "IST day buckets for charts", m0014_created_day_buckets),
+    (15, "daily sales rollup", m0015_sales_daily),
+    (16, "commit-ordered change log", m0016_change_log_seq),
+    (17, "inventory valuation snapshots", m0017_valuation_snapshots),
+]
+
+
+# ---------------- RUNNER ----------------
+def applied_versions(conn):
+    schema_migrations.create(bind=conn, checkfirst=True)
+    return {row.version for row in conn.execute(schema_migrations.select())}
+
+
+def pending_migrations(conn):
+    done = applied_versions(conn)
+    return [m for m in MIGRATIONS if m[0] not in done]
+
+
+def migrate(target=None):
+    with get_engine().connect() as conn:
+        pending = pending_migrations(conn)
+        conn.commit()
+
+    for version, name, step in pending:
+        if target is not None and version > target:
+            break
+
+        logger.info("Applying %04d %s", version, name)
+        with get_engine().begin() as conn:
+            step(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version,
+                name=name,
+                applied_at=datetime.now(timezone.utc).replace(tzinfo=None),
+            ))
+
+    logger.info("Schema is up to date")
+
+
+def print_status():
+    with get_engine().connect() as conn:
+        done = applied_versions(conn)
+        conn.commit()
+
+    for version, name, _ in MIGRATIONS:
+        mark = "applied" if version in done else "pending"
+        print(f"{version:04d}  {mark:8}  {name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply schema migrations")
+    parser.add_argument("--status", action="store_true", help="show applied and pending migrations")
+    parser.add_argument("--check", action="store_true", help="exit 1 if migrations are pending")
+    parser.add_argument("--to", type=int, default=None, help="stop after this version")
+    args = parser.parse_args()
+
+    if args.status:
+        print_status()
+    elif args.check:
+        with get_engine().connect() as conn:
+            pending = pending_migrations(conn)
+            conn.commit()
+        for version, name, _ in pending:
+            print(f"pending: {version:04d} {name}")
+        sys.exit(1 if pending else 0)
+    else:
+        migrate(target=args.to)
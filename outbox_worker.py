@@ -0,0 +1,197 @@
+"""
+Process outbox_events written by the API (see enqueue_event in main.py).
+
+Each event runs in its own transaction together with the update that marks
+it done, so a crash mid-handler just means the event is picked up again.
+Handlers return the versioned tables they changed (if any); those are bumped
+once the transaction has committed.
+Failed events are retried with exponential backoff and parked as "dead"
+after OUTBOX_MAX_ATTEMPTS. Handlers must be safe to run more than once.
+
+Every poll it also numbers newly committed change_log rows (stamp_changes),
+which is what moves them into /api/sync/changes; writers never wait on that.
+Once an hour it purges processed events and prunes change_log.
+
+Several workers can run side by side on MySQL 8 (rows are claimed with
+SKIP LOCKED).
+
+    python outbox_worker.py            # run forever
+    python outbox_worker.py --once     # drain what's due and exit
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from main import (
+    IST, OutboxEvent, ProductModel,
+    bump_table_versions, generate_qr, get_engine, loads, prune_change_log, record_changes,
+    recompute_customer_metrics, stamp_changes,
+)
+
+logger = logging.getLogger("outbox_worker")
+
+POLL_SECONDS = 1.0
+OUTBOX_MAX_ATTEMPTS = 10
+MAX_BACKOFF_SECONDS = 3600
+# Processed events are kept this long for debugging, then purged
+DONE_RETENTION = timedelta(days=7)
+PURGE_EVERY_SECONDS = 3600
+
+events = OutboxEvent.__table__
+products = ProductModel.__table__
+
+
+# ---------------- HANDLERS ----------------
+def refresh_customer_metrics(conn, payload):
+    # Recount from invoices rather than add a delta: replays can't double count
+    recompute_customer_metrics(conn, [payload["customer_id"]])
+
+
+def _write_qr_codes(conn, product_ids, only_missing):
+    # Writes into static/qr: run the worker from the app directory
+    query = select(products.c.id, products.c.sku, products.c.name, products.c.selling_price).where(
+        products.c.id.in_(product_ids)
+    )
+    if only_missing:
+        query = query.where(products.c.qr_code_url.is_(None))
+    rows = conn.execute(query).all()
+    for row in rows:
+        url = generate_qr({"sku": row.sku, "name": row.name, "price": row.selling_price})
+        conn.execute(update(products).where(products.c.id == row.id).values(qr_code_url=url))
+
+    record_changes(conn, "products", [row.id for row in rows])
+    return ["products"] if rows else []
+
+
+def generate_imported_qr_codes(conn, payload):
+    # Skips products that already have one, so a retried batch resumes
+    return _write_qr_codes(conn, payload["product_ids"], only_missing=True)
+
+
+def regenerate_repriced_qr_codes(conn, payload):
+    # The QR payload embeds the price; reads it now, so back-to-back
+    # repricings just end on the latest one
+    return _write_qr_codes(conn, payload["product_ids"], only_missing=False)
+
+
+HANDLERS = {
+    "invoice.created": [refresh_customer_metrics],
+    "products.imported": [generate_imported_qr_codes],
+    "products.repriced": [regenerate_repriced_qr_codes],
+}
+
+
+# ---------------- WORKER ----------------
+def _now():
+    return datetime.now(IST).replace(tzinfo=None)
+
+
+def _claim_next(conn):
+    return conn.execute(
+        select(events.c.id, events.c.event_type, events.c.payload, events.c.attempts)
+        .where(events.c.status == "pending", events.c.available_at <= _now())
+        .order_by(events.c.available_at, events.c.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).first()
+
+
+def _record_failure(engine, event, error):
+    attempts = event.attempts + 1
+    dead = attempts >= OUTBOX_MAX_ATTEMPTS
+    backoff = min(2 ** attempts, MAX_BACKOFF_SECONDS)
+    with engine.begin() as conn:
+        conn.execute(
+            update(events)
+            .where(events.c.id == event.id)
+            .values(
+                attempts=attempts,
+                last_error=f"{type(error).__name__}: {error}"[:2000],
+                status="dead" if dead else "pending",
+                available_at=_now() + timedelta(seconds=backoff),
+            )
+        )
+    if dead:
+        logger.error("Event %s (%s) is dead after %d attempts", event.id, event.event_type, attempts)
+    else:
+        logger.warning("Event %s (%s) failed, retry in %ds: %s", event.id, event.event_type, backoff, error)
+
+
+def process_one(engine):
+    """Handle one due event; returns False when there is nothing to do."""
+    conn = engine.connect()
+    trans = conn.begin()
+    event = None
+    try:
+        event = _claim_next(conn)
+        if event is None:
+            trans.rollback()
+            return False
+
+        changed = set()
+        for handler in HANDLERS.get(event.event_type, ()):
+            changed.update(handler(conn, loads(event.payload)) or ())
+
+        conn.execute(
+            update(events)
+            .where(events.c.id == event.id)
+            .values(status="done", attempts=event.attempts + 1, processed_at=_now())
+        )
+        trans.commit()
+        bump_table_versions(changed)
+        return True
+    except Exception as error:
+        trans.rollback()
+        if event is None:
+            raise
+        _record_failure(engine, event, error)
+        return True
+    finally:
+        conn.close()
+
+
+def purge_done(engine):
+    with engine.begin() as conn:
+        result = conn.execute(
+            events.delete().where(
+                events.c.status == "done",
+                events.c.processed_at < _now() - DONE_RETENTION,
+            )
+        )
+    if result.rowcount:
+        logger.info("Purged %d processed events", result.rowcount)
+    # Same cadence for the sync feed: superseded entries and old tombstones
+    pruned = prune_change_log(engine)
+    if pruned:
+        logger.info("Pruned %d change_log entries", pruned)
+
+
+def run(once=False):
+    engine = get_engine()
+    purged_at = 0.0
+    while True:
+        if time.monotonic() - purged_at > PURGE_EVERY_SECONDS:
+            purge_done(engine)
+            purged_at = time.monotonic()
+
+        handled = 0
+        while process_one(engine):
+            handled += 1
+        if handled:
+            logger.info("Processed %d events", handled)
+        # After the events, so changes their handlers made go out this poll
+        stamp_changes(engine)
+
+        if once:
+            return
+        time.sleep(POLL_SECONDS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the outbox event worker")
+    parser.add_argument("--once", action="store_true", help="drain due events and exit")
+    args = parser.parse_args()
+    run(once=args.once)
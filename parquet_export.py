@@ -0,0 +1,228 @@
+"""
+Monthly Parquet snapshots of the main tables for offline analysis.
+
+    python parquet_export.py --out /data/rrdie          # new partitions only
+    python parquet_export.py --out /data/rrdie --rebuild
+
+Layout (Hive-style, readable by pandas/pyarrow/DuckDB/Spark as one dataset):
+
+    invoices/month=2025-04/part-0.parquet                one row per line item
+    inventory_transactions/month=2025-04/part-0.parquet
+    products/month=2025-04/part-0.parquet                snapshot as of the last run that month
+    customers/month=2025-04/part-0.parquet               snapshot incl. customer_metrics
+
+Invoices and the ledger are partitioned by created_at (IST). Open months are
+rewritten every run. The first run after a month has closed (by more than
+FINAL_GRACE) writes it one last time and marks it final with a `_FINAL`
+sidecar; only final partitions are skipped. A month last written while it
+was still open therefore still gets its remaining days. Products and
+customers change in place, so each run replaces the current month's snapshot
+and earlier months keep theirs. Partitions are streamed to a temp file one
+row group per chunk and renamed, so readers never see a half-written file.
+
+Every partition of a table carries the same Arrow schema (derived from the
+column types), so empty months and all-NULL columns still read back as one
+dataset, e.g. `pandas.read_parquet("/data/rrdie/invoices")`.
+"""
+import argparse
+import logging
+import os
+from datetime import datetime, timedelta
+from itertools import islice
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import DateTime, Float, Integer, func
+
+from main import (
+    IST, CategoryModel, CustomerMetrics, CustomerModel, InventoryTransaction, InvoiceModel, ProductModel,
+    INVOICE_EXPORT_COLUMNS, INVOICE_EXPORT_FIELDS, LEDGER_EXPORT_COLUMNS, LEDGER_EXPORT_FIELDS,
+    CHUNK_RECORDS, invoice_export_records, new_session,
+)
+
+logger = logging.getLogger("parquet_export")
+
+COMPRESSION = "zstd"
+# A closed month is final once it ended this long before the run started
+FINAL_GRACE = timedelta(hours=1)
+FINAL_MARKER = "_FINAL"  # "_" prefix: skipped by Parquet dataset readers
+# Rows buffered per row group; fetched from the DB in CHUNK_RECORDS batches
+ROW_GROUP_RECORDS = 50000
+
+PRODUCT_SNAPSHOT_COLUMNS = [
+    ProductModel.id, ProductModel.product_code, ProductModel.sku, ProductModel.name,
+    ProductModel.category_id, func.coalesce(CategoryModel.name, "Unknown"),
+    ProductModel.cost_price, ProductModel.min_selling_price, ProductModel.selling_price,
+    ProductModel.stock, ProductModel.min_stock, ProductModel.created_at,
+]
+PRODUCT_SNAPSHOT_FIELDS = (
+    "id", "product_code", "sku", "name", "category_id", "category_name",
+    "cost_price", "min_selling_price", "selling_price", "stock", "min_stock", "created_at",
+)
+
+CUSTOMER_SNAPSHOT_COLUMNS = [
+    CustomerModel.id, CustomerModel.name, CustomerModel.email, CustomerModel.phone,
+    CustomerModel.phone_normalized, CustomerModel.address, CustomerModel.created_at,
+    CustomerMetrics.invoice_count, CustomerMetrics.lifetime_value,
+    CustomerMetrics.pending_amount, CustomerMetrics.last_invoice_at,
+]
+CUSTOMER_SNAPSHOT_FIELDS = (
+    "id", "name", "email", "phone", "phone_normalized", "address", "created_at",
+    "invoice_count", "lifetime_value", "pending_amount", "last_invoice_at",
+)
+
+
+# ---------------- SCHEMAS ----------------
+def arrow_type(sql_type):
+    if isinstance(sql_type, Integer):
+        return pa.int64()
+    if isinstance(sql_type, Float):
+        return pa.float64()
+    if isinstance(sql_type, DateTime):
+        return pa.timestamp("us")
+    return pa.string()
+
+
+def arrow_schema(fields, columns, extra_types=()):
+    types = [arrow_type(column.type) for column in columns] + list(extra_types)
+    return pa.schema(list(zip(fields, types)))
+
+
+# Invoice line items come from the JSON `items` column, not a typed column
+INVOICE_ITEM_TYPES = (
+    pa.int64(),                                   # line_no
+    pa.string(), pa.string(), pa.string(),        # product_id, sku, product_name
+    pa.int64(),                                   # quantity
+    pa.float64(), pa.float64(), pa.float64(),     # price, gst_rate, line_total
+)
+
+SCHEMAS = {
+    "invoices": arrow_schema(INVOICE_EXPORT_FIELDS, INVOICE_EXPORT_COLUMNS[:-1], INVOICE_ITEM_TYPES),
+    "inventory_transactions": arrow_schema(LEDGER_EXPORT_FIELDS, LEDGER_EXPORT_COLUMNS),
+    "products": arrow_schema(PRODUCT_SNAPSHOT_FIELDS, PRODUCT_SNAPSHOT_COLUMNS),
+    "customers": arrow_schema(CUSTOMER_SNAPSHOT_FIELDS, CUSTOMER_SNAPSHOT_COLUMNS),
+}
+
+
+# ---------------- MONTHS ----------------
+def month_start(year, month):
+    return datetime(year, month, 1, tzinfo=IST)
+
+
+def next_month(start):
+    return month_start(start.year + start.month // 12, start.month % 12 + 1)
+
+
+def months_between(first, last):
+    current = month_start(first.year, first.month)
+    while current <= last:
+        yield current
+        current = next_month(current)
+
+
+# ---------------- WRITING ----------------
+def partition_path(out_dir, table, start):
+    return os.path.join(out_dir, table, f"month={start:%Y-%m}", "part-0.parquet")
+
+
+def final_marker_path(path):
+    return os.path.join(os.path.dirname(path), FINAL_MARKER)
+
+
+def write_partition(path, records, schema, chunk_records=ROW_GROUP_RECORDS):
+    """Stream `records` into `path`, one row group per chunk; returns the row count."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    records = iter(records)
+    count = 0
+    try:
+        # An empty partition is still a valid file carrying the schema
+        with pq.ParquetWriter(tmp_path, schema, compression=COMPRESSION) as writer:
+            while chunk := list(islice(records, chunk_records)):
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)],
+                    schema=schema,
+                ))
+                count += len(chunk)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return count
+
+
+# ---------------- TABLES ----------------
+def export_monthly(db, out_dir, table, model, columns, to_records, rebuild=False, join=None):
+    first = db.query(func.min(model.created_at)).scalar()
+    if first is None:
+        return 0
+
+    now = datetime.now(IST)
+    written = 0
+    for start in months_between(first, now):
+        path = partition_path(out_dir, table, start)
+        marker = final_marker_path(path)
+        if os.path.exists(marker):
+            if not rebuild:
+                continue
+            os.remove(marker)
+
+        query = db.query(*columns)
+        if join is not None:
+            query = join(query)
+        rows = (
+            query.filter(model.created_at >= start, model.created_at < next_month(start))
+            .order_by(model.created_at, model.id)
+            .yield_per(CHUNK_RECORDS)
+        )
+        count = write_partition(path, to_records(rows), SCHEMAS[table])
+        final = next_month(start) + FINAL_GRACE <= now
+        if final:
+            open(marker, "w").close()
+        logger.info("%s %s: %d rows%s", table, f"{start:%Y-%m}", count, " (final)" if final else "")
+        written += 1
+    return written
+
+
+def export_snapshot(db, out_dir, table, query):
+    now = datetime.now(IST)
+    path = partition_path(out_dir, table, month_start(now.year, now.month))
+    count = write_partition(path, (tuple(row) for row in query.yield_per(CHUNK_RECORDS)), SCHEMAS[table])
+    logger.info("%s snapshot %s: %d rows", table, f"{now:%Y-%m}", count)
+
+
+def run(out_dir, rebuild=False):
+    db = new_session()
+    try:
+        export_monthly(
+            db, out_dir, "invoices", InvoiceModel,
+            INVOICE_EXPORT_COLUMNS, invoice_export_records, rebuild,
+        )
+        export_monthly(
+            db, out_dir, "inventory_transactions", InventoryTransaction,
+            LEDGER_EXPORT_COLUMNS, lambda rows: (tuple(r) for r in rows), rebuild,
+            join=lambda q: q.outerjoin(ProductModel, ProductModel.id == InventoryTransaction.product_id),
+        )
+        export_snapshot(
+            db, out_dir, "products",
+            db.query(*PRODUCT_SNAPSHOT_COLUMNS)
+            .outerjoin(CategoryModel, CategoryModel.id == ProductModel.category_id)
+            .order_by(ProductModel.id),
+        )
+        export_snapshot(
+            db, out_dir, "customers",
+            db.query(*CUSTOMER_SNAPSHOT_COLUMNS)
+            .outerjoin(CustomerMetrics, CustomerMetrics.customer_id == CustomerModel.id)
+            .order_by(CustomerModel.id),
+        )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export monthly Parquet partitions")
+    parser.add_argument("--out", required=True, help="output directory")
+    parser.add_argument("--rebuild", action="store_true", help="rewrite finished months too")
+    args = parser.parse_args()
+    run(args.out, rebuild=args.rebuild)
@@ -0,0 +1,195 @@
+"""
+Nightly ABC/XYZ rollup into product_classifications.
+
+    ABC  revenue over the window from invoice line items (cancelled invoices
+         excluded), ranked: the products making up the first 80% of revenue
+         are A, the next 15% B, the rest (and anything unsold) C.
+    XYZ  coefficient of variation of weekly demand (INVOICE and
+         MATERIAL_OUTWARD ledger movements) over the weeks the product
+         existed (see reorder_forecast.demand_stats): <= 0.5 X, <= 1.0 Y, otherwise Z; no demand is Z.
+
+Invoices are streamed in batches and each batch's JSON line items reduced
+with pandas, so memory stays flat however long the history is; the ledger
+is pre-aggregated per product and day in SQL. Units out up to the run are
+stored alongside for /dashboard/abc-xyz and /dashboard/top-products, which
+adds the movements since. The table is replaced in one
+transaction and the API picks the new rollup up on its next request.
+
+    python product_classification.py               # 365-day window
+    python product_classification.py --window 180
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+
+from main import (
+    IST, UNBILLED_STATUSES, InventoryTransaction, InvoiceModel,
+    ProductClassification, ProductModel, get_engine, parse_invoice_items,
+)
+from reorder_forecast import DEMAND_SOURCES, demand_stats
+
+logger = logging.getLogger("product_classification")
+
+WINDOW_DAYS = 365
+BATCH_SIZE = 5000
+ABC_CUTOFFS = (0.80, 0.95)
+XYZ_CUTOFFS = (0.5, 1.0)
+INSERT_CHUNK = 1000
+
+products = ProductModel.__table__
+invoices = InvoiceModel.__table__
+ledger = InventoryTransaction.__table__
+classifications = ProductClassification.__table__
+
+
+def invoice_revenue(conn, since, batch_size=BATCH_SIZE):
+    """Series of line-item revenue per product_id."""
+    result = conn.execution_options(yield_per=batch_size).execute(
+        select(InvoiceModel.items).where(
+            invoices.c.created_at >= since,
+            invoices.c.payment_status.notin_(UNBILLED_STATUSES),
+        )
+    )
+    partials = []
+    for batch in result.partitions():
+        # JSON, or Python literals on invoices from before the JSON switch
+        items = [item for (raw,) in batch for item in parse_invoice_items(raw)]
+        if not items:
+            continue
+        frame = pd.DataFrame.from_records(items, columns=["product_id", "total"])
+        partials.append(frame.groupby("product_id")["total"].sum())
+        if len(partials) >= 20:
+            partials = [pd.concat(partials).groupby(level=0).sum()]
+    if not partials:
+        return pd.Series(dtype=float)
+    return pd.concat(partials).groupby(level=0).sum()
+
+
+def weekly_demand_cv(conn, catalog, since, window):
+    """Series of weekly-demand coefficient of variation per product_id."""
+    day = func.date(ledger.c.created_at)
+    daily = pd.DataFrame(
+        conn.execute(
+            select(ledger.c.product_id, day, func.sum(ledger.c.quantity))
+            .where(
+                ledger.c.type == "OUT",
+                ledger.c.created_at >= since,
+                ledger.c.source.in_(DEMAND_SOURCES),
+                ledger.c.product_id.isnot(None),
+            )
+            .group_by(ledger.c.product_id, day)
+        ).all(),
+        columns=["product_id", "day", "quantity"],
+    )
+    weeks = -(-window // 7)
+    start = np.datetime64(since.date(), "D")
+    position = pd.Series(np.arange(len(catalog)), index=catalog["product_id"])
+
+    demand = np.zeros((len(catalog), weeks))
+    daily = daily[daily["product_id"].isin(position.index)]
+    if len(daily):
+        days = pd.to_datetime(daily["day"].astype(str)).to_numpy().astype("datetime64[D]")
+        week = np.clip((days - start).astype(int) // 7, 0, weeks - 1)
+        np.add.at(demand, (position[daily["product_id"]].to_numpy(), week), daily["quantity"].to_numpy(float))
+
+    created = pd.to_datetime(catalog["created_at"].fillna(since)).to_numpy().astype("datetime64[D]")
+    first_week = np.clip((created - start).astype(int) // 7, 0, weeks - 1)
+    mean, std, _ = demand_stats(demand, first_week)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cv = np.where(mean > 0, std / mean, np.nan)
+    return pd.Series(cv, index=catalog["product_id"])
+
+
+def units_out(conn, until):
+    # Up to computed_at: /dashboard/top-products adds the movements since
+    return pd.Series(dict(conn.execute(
+        select(ledger.c.product_id, func.sum(ledger.c.quantity))
+        .where(ledger.c.type == "OUT", ledger.c.product_id.isnot(None), ledger.c.created_at < until)
+        .group_by(ledger.c.product_id)
+    ).all()), dtype=float)
+
+
+def classify(revenue, cv):
+    """revenue, cv: aligned Series. Returns (revenue_share, abc, xyz) arrays."""
+    order = np.argsort(-revenue.to_numpy(), kind="stable")
+    ranked = revenue.to_numpy()[order]
+    total = ranked.sum()
+    share = ranked / total if total > 0 else np.zeros_like(ranked)
+    # Class by the share *before* the product, so the one crossing 80% is still A
+    before = np.cumsum(share) - share
+    abc_ranked = np.select([before < ABC_CUTOFFS[0], before < ABC_CUTOFFS[1]], ["A", "B"], "C")
+    abc_ranked[ranked <= 0] = "C"
+
+    abc = np.empty(len(ranked), dtype="<U1")
+    abc[order] = abc_ranked
+    revenue_share = np.empty(len(ranked))
+    revenue_share[order] = share
+
+    values = cv.to_numpy()
+    xyz = np.select(
+        [values <= XYZ_CUTOFFS[0], values <= XYZ_CUTOFFS[1]], ["X", "Y"], "Z"
+    )
+    return revenue_share, abc, xyz
+
+
+def run(window=WINDOW_DAYS, batch_size=BATCH_SIZE):
+    started = time.perf_counter()
+    now = datetime.now(IST).replace(tzinfo=None)
+    since = datetime.combine(now.date() - timedelta(days=window - 1), datetime.min.time())
+
+    engine = get_engine()
+    with engine.connect() as conn:
+        catalog = pd.DataFrame(
+            conn.execute(select(products.c.id, products.c.created_at)).all(),
+            columns=["product_id", "created_at"],
+        )
+        if catalog.empty:
+            logger.info("No products to classify")
+            return 0
+        ids = catalog["product_id"]
+        revenue = invoice_revenue(conn, since, batch_size).reindex(ids, fill_value=0.0)
+        cv = weekly_demand_cv(conn, catalog, since, window)
+        out = units_out(conn, now).reindex(ids, fill_value=0.0)
+
+    revenue_share, abc, xyz = classify(revenue, cv)
+    records = [
+        {
+            "product_id": pid,
+            "revenue": round(rev, 2),
+            "revenue_share": round(share, 6),
+            "abc": a,
+            "demand_cv": None if np.isnan(c) else round(c, 4),
+            "xyz": x,
+            "units_out": int(units),
+            "computed_at": now,
+        }
+        for pid, rev, share, a, c, x, units in zip(
+            ids, revenue.tolist(), revenue_share.tolist(), abc.tolist(),
+            cv.tolist(), xyz.tolist(), out.tolist(),
+        )
+    ]
+    with engine.begin() as conn:
+        conn.execute(classifications.delete())
+        for i in range(0, len(records), INSERT_CHUNK):
+            conn.execute(classifications.insert(), records[i:i + INSERT_CHUNK])
+
+    counts = pd.Series([a + x for a, x in zip(abc, xyz)]).value_counts().sort_index()
+    logger.info(
+        "Classified %d products in %.2f s: %s",
+        len(records), time.perf_counter() - started,
+        ", ".join(f"{cell}={n}" for cell, n in counts.items()),
+    )
+    return len(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild ABC/XYZ product classifications")
+    parser.add_argument("--window", type=int, default=WINDOW_DAYS, help="days of history")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="invoices per batch")
+    args = parser.parse_args()
+    run(window=args.window, batch_size=args.batch_size)
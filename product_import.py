@@ -0,0 +1,239 @@
+"""
+Bulk product import from CSV / Excel.
+
+The whole sheet is validated column-wise with pandas (same rules as
+create_product), categories are resolved by name or id from one query,
+valid rows go in as multi-row INSERTs in one transaction, and QR images are
+generated afterwards by outbox_worker.py (`products.imported` events).
+Invalid rows are skipped and reported with their spreadsheet row number.
+
+Columns: name, category, cost_price, min_selling_price, selling_price, stock,
+and optionally description, min_stock, sku, image_url, images ("|"-separated).
+
+    python product_import.py catalog.xlsx
+    python product_import.py catalog.csv --dry-run
+
+Also served as POST /api/products/import (admin only).
+"""
+import argparse
+import logging
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert, select
+
+from main import (
+    IST, CategoryModel, InventoryTransaction, ProductModel,
+    bump_table_versions, enqueue_event, generate_product_codes, generate_skus, new_session,
+    record_changes,
+)
+
+logger = logging.getLogger("product_import")
+
+REQUIRED_COLUMNS = ("name", "category", "cost_price", "min_selling_price", "selling_price", "stock")
+OPTIONAL_COLUMNS = ("description", "min_stock", "sku", "image_url", "images")
+PRICE_COLUMNS = ("cost_price", "min_selling_price", "selling_price")
+DEFAULT_MIN_STOCK = 5
+MAX_IMAGES = 5
+IMAGE_SEPARATOR = "|"
+
+INSERT_BATCH = 1000
+# Products per products.imported event (one QR batch per worker transaction)
+QR_EVENT_BATCH = 500
+LOOKUP_BATCH = 1000
+
+
+class ImportFileError(ValueError):
+    """The file itself can't be imported (format, missing columns)."""
+
+
+def read_sheet(source, filename):
+    """Load a .csv/.xlsx upload as an all-string frame with normalized headers."""
+    name = (filename or "").lower()
+    if name.endswith((".xlsx", ".xlsm")):
+        frame = pd.read_excel(source, dtype=str)
+    elif name.endswith(".csv"):
+        frame = pd.read_csv(source, dtype=str, keep_default_na=False)
+    else:
+        raise ImportFileError("Upload a .csv or .xlsx file")
+
+    frame.columns = [str(c).strip().lower().replace(" ", "_") for c in frame.columns]
+    missing = [c for c in REQUIRED_COLUMNS if c not in frame.columns]
+    if missing:
+        raise ImportFileError(f"Missing columns: {', '.join(missing)}")
+    for column in OPTIONAL_COLUMNS:
+        if column not in frame.columns:
+            frame[column] = ""
+
+    frame = frame[list(REQUIRED_COLUMNS + OPTIONAL_COLUMNS)].fillna("")
+    frame = frame.apply(lambda column: column.astype(str).str.strip())
+    return frame.reset_index(drop=True)
+
+
+def _existing(db, column, values):
+    found = set()
+    values = list(values)
+    for i in range(0, len(values), LOOKUP_BATCH):
+        chunk = values[i:i + LOOKUP_BATCH]
+        found.update(db.scalars(select(column).where(column.in_(chunk))))
+    return found
+
+
+def _category_lookup(db):
+    lookup = {}
+    for category_id, name in db.query(CategoryModel.id, CategoryModel.name):
+        lookup[name.strip().lower()] = category_id
+        lookup[category_id.lower()] = category_id
+    return lookup
+
+
+def _split_images(value):
+    return [i.strip() for i in value.split(IMAGE_SEPARATOR) if i.strip()] if value else []
+
+
+def validate(db, frame):
+    """
+    Returns (parsed columns, failed mask, errors).
+
+    Every rule is one vectorized mask over all rows; only failing rows are
+    visited afterwards to list their messages.
+    """
+    parsed = {col: pd.to_numeric(frame[col], errors="coerce") for col in PRICE_COLUMNS + ("stock",)}
+    parsed["min_stock"] = pd.to_numeric(
+        frame["min_stock"].replace("", str(DEFAULT_MIN_STOCK)), errors="coerce"
+    )
+    parsed["images"] = frame["images"].map(_split_images)
+    parsed["category_id"] = frame["category"].str.lower().map(_category_lookup(db))
+
+    checks = {"name is required": frame["name"] == ""}
+    for col in PRICE_COLUMNS:
+        checks[f"{col} must be a number >= 0"] = parsed[col].isna() | (parsed[col] < 0)
+    for col in ("stock", "min_stock"):
+        checks[f"{col} must be a whole number >= 0"] = (
+            parsed[col].isna() | (parsed[col] < 0) | (parsed[col] % 1 != 0)
+        )
+    checks["Selling price cannot be below minimum selling price"] = (
+        parsed["selling_price"] < parsed["min_selling_price"]
+    )
+    checks[f"Maximum {MAX_IMAGES} images allowed"] = parsed["images"].str.len() > MAX_IMAGES
+    checks["Unknown category"] = parsed["category_id"].isna()
+
+    sku = frame["sku"]
+    given = sku != ""
+    checks["Duplicate sku in file"] = given & sku.duplicated(keep=False)
+    taken = _existing(db, ProductModel.sku, sku[given].unique())
+    checks["sku already exists"] = given & sku.isin(taken)
+
+    masks = {message: mask.to_numpy(dtype=bool) for message, mask in checks.items()}
+    failed = np.logical_or.reduce(list(masks.values()))
+    errors = [
+        {
+            "row": int(pos) + 2,  # 1-based, after the header row
+            "errors": [message for message, mask in masks.items() if mask[pos]],
+        }
+        for pos in np.flatnonzero(failed)
+    ]
+    return parsed, failed, errors
+
+
+def _blank_to_none(column):
+    return column.astype(object).where(column != "", None)
+
+
+def import_products(db, frame, dry_run=False, created_by=None):
+    parsed, failed, errors = validate(db, frame)
+    ok = ~failed
+    count = int(ok.sum())
+    summary = {
+        "rows": len(frame),
+        "imported": 0 if dry_run else count,
+        "valid": count,
+        "failed": len(errors),
+        "errors": errors,
+        "dry_run": dry_run,
+    }
+    if dry_run or not count:
+        return summary
+
+    rows = frame[ok]
+    ids = [str(uuid.uuid4()) for _ in range(count)]
+    blank_sku = rows["sku"] == ""
+    generated_skus = pd.Series(
+        generate_skus(db, int(blank_sku.sum()), exclude=rows["sku"][~blank_sku]),
+        index=rows.index[blank_sku], dtype=object,
+    )
+    now = datetime.now(IST)
+
+    records = pd.DataFrame({
+        "id": ids,
+        "product_code": generate_product_codes(count),
+        "name": rows["name"],
+        "description": _blank_to_none(rows["description"]),
+        "category_id": parsed["category_id"][ok],
+        "cost_price": parsed["cost_price"][ok].astype(float),
+        "min_selling_price": parsed["min_selling_price"][ok].astype(float),
+        "selling_price": parsed["selling_price"][ok].astype(float),
+        "stock": parsed["stock"][ok].astype(int),
+        "min_stock": parsed["min_stock"][ok].astype(int),
+        "sku": rows["sku"].where(~blank_sku, generated_skus),
+        "image_url": _blank_to_none(rows["image_url"]),
+        "images": parsed["images"][ok],
+    }).to_dict("records")
+    for record in records:
+        record["created_at"] = now
+
+    # Opening stock goes on the ledger at its cost, for valuation
+    ledger = [
+        {
+            "id": str(uuid.uuid4()),
+            "product_id": record["id"],
+            "type": "IN",
+            "quantity": record["stock"],
+            "source": "OPENING_STOCK",
+            "reason": "Product import",
+            "stock_before": 0,
+            "stock_after": record["stock"],
+            "unit_cost": record["cost_price"],
+            "created_by": created_by,
+            "created_at": now,
+        }
+        for record in records
+        if record["stock"] > 0
+    ]
+
+    for i in range(0, count, INSERT_BATCH):
+        db.execute(insert(ProductModel.__table__), records[i:i + INSERT_BATCH])
+    for i in range(0, len(ledger), INSERT_BATCH):
+        db.execute(insert(InventoryTransaction.__table__), ledger[i:i + INSERT_BATCH])
+
+    # Core INSERT bypasses the session hooks: log for sync/scan index by hand
+    record_changes(db.connection(), "products", ids)
+    for i in range(0, count, QR_EVENT_BATCH):
+        enqueue_event(db, "products.imported", {"product_ids": ids[i:i + QR_EVENT_BATCH]})
+
+    db.commit()
+    bump_table_versions(["products"])
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import products from a CSV / Excel file")
+    parser.add_argument("path")
+    parser.add_argument("--dry-run", action="store_true", help="validate only, insert nothing")
+    args = parser.parse_args()
+
+    db = new_session()
+    try:
+        with open(args.path, "rb") as source:
+            result = import_products(db, read_sheet(source, args.path), dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    for error in result["errors"]:
+        logger.warning("row %d: %s", error["row"], "; ".join(error["errors"]))
+    logger.info(
+        "%d rows: %d imported, %d failed%s",
+        result["rows"], result["imported"], result["failed"], " (dry run)" if args.dry_run else "",
+    )
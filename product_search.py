@@ -0,0 +1,221 @@
+"""
+In-memory product search: prefix + typo-tolerant matching with ranking.
+
+Pure data structure; main.py feeds it the same product rows as the scan
+index and keeps it in sync through the same change_log refresh.
+
+Each product is indexed by the tokens of its name, category name, SKU and
+product code. A query term matches a token exactly, by prefix (sorted token
+list + bisect) or, when nothing else matches, by trigram similarity. Results
+are ranked by field weight and match quality and the top k returned.
+"""
+import bisect
+import heapq
+import re
+import threading
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# How much a hit in each field is worth
+FIELD_WEIGHTS = {"code": 4.0, "name": 2.0, "category": 1.0}
+
+EXACT, PREFIX = 1.0, 0.7
+FUZZY_MIN_SIMILARITY = 0.45
+# Tokens a prefix may expand to; one-letter prefixes get far fewer
+MAX_PREFIX_EXPANSION = 200
+MAX_SHORT_PREFIX_EXPANSION = 20
+# 1-2 letter terms: products their best completions may cover in total.
+# Each common token lists thousands, so a token cap alone doesn't bound it.
+SHORT_TERM_LENGTH = 2
+MAX_SHORT_TERM_HITS = 2000
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def _trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ProductSearchIndex:
+    def __init__(self):
+        self._docs = {}          # product id -> product dict
+        self._doc_tokens = {}    # product id -> {(token, field)}
+        self._postings = {}      # token -> {product id: best field weight}
+        self._sorted_tokens = []
+        self._trigram_tokens = {}  # trigram -> {token}
+        self._lock = threading.RLock()
+        self.ready = False
+
+    def __len__(self):
+        return len(self._docs)
+
+    # ---------------- BUILD / UPDATE ----------------
+    @staticmethod
+    def _fields(product):
+        # Codes are indexed whole ("prd20250101ab12", typed with or without
+        # dashes) and by their last segment ("ab12"); the shared "prd"/date
+        # parts would otherwise match every product
+        code_tokens = set()
+        for code in (product.get("sku"), product.get("product_code")):
+            parts = tokenize(code)
+            if parts:
+                code_tokens.add("".join(parts))
+                code_tokens.add(parts[-1])
+        return [
+            ("code", code_tokens),
+            ("name", set(tokenize(product.get("name")))),
+            ("category", set(tokenize(product.get("category_name")))),
+        ]
+
+    def load(self, products):
+        with self._lock:
+            self._docs.clear()
+            self._doc_tokens.clear()
+            self._postings.clear()
+            self._trigram_tokens.clear()
+            self._sorted_tokens = []
+            for product in products:
+                self._add(product, keep_sorted=False)
+            self._sorted_tokens = sorted(self._postings)
+            self.ready = True
+
+    def upsert(self, product):
+        with self._lock:
+            self._remove(product["id"])
+            self._add(product, keep_sorted=True)
+
+    def remove(self, product_id):
+        with self._lock:
+            self._remove(product_id)
+
+    def _add(self, product, keep_sorted):
+        pid = product["id"]
+        self._docs[pid] = product
+        entries = set()
+        for field, tokens in self._fields(product):
+            weight = FIELD_WEIGHTS[field]
+            for token in tokens:
+                entries.add((token, field))
+                posting = self._postings.get(token)
+                if posting is None:
+                    posting = self._postings[token] = {}
+                    for gram in _trigrams(token):
+                        self._trigram_tokens.setdefault(gram, set()).add(token)
+                    if keep_sorted:
+                        bisect.insort(self._sorted_tokens, token)
+                if posting.get(pid, 0) < weight:
+                    posting[pid] = weight
+        self._doc_tokens[pid] = entries
+
+    def _remove(self, pid):
+        if self._docs.pop(pid, None) is None:
+            return
+        for token, _ in self._doc_tokens.pop(pid, ()):
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(pid, None)
+            if not posting:
+                del self._postings[token]
+                i = bisect.bisect_left(self._sorted_tokens, token)
+                if i < len(self._sorted_tokens) and self._sorted_tokens[i] == token:
+                    del self._sorted_tokens[i]
+                for gram in _trigrams(token):
+                    grams = self._trigram_tokens.get(gram)
+                    if grams is not None:
+                        grams.discard(token)
+                        if not grams:
+                            del self._trigram_tokens[gram]
+
+    # ---------------- QUERY ----------------
+    def _term_matches(self, term):
+        """Yield (token, match quality) for one query term."""
+        if term in self._postings:
+            yield term, EXACT
+
+        limit = MAX_PREFIX_EXPANSION if len(term) > 1 else MAX_SHORT_PREFIX_EXPANSION
+        start = bisect.bisect_left(self._sorted_tokens, term)
+        for token in self._sorted_tokens[start:start + limit]:
+            if not token.startswith(term):
+                break
+            if token != term:
+                # Shorter completions rank a little higher
+                yield token, PREFIX * (0.5 + 0.5 * len(term) / len(token))
+
+    def _fuzzy_matches(self, term):
+        grams = _trigrams(term)
+        counts = {}
+        for gram in grams:
+            for token in self._trigram_tokens.get(gram, ()):
+                counts[token] = counts.get(token, 0) + 1
+        for token, shared in counts.items():
+            similarity = 2 * shared / (len(grams) + len(token) + 1)
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                yield token, PREFIX * similarity
+
+    def _matches(self, term):
+        matches = list(self._term_matches(term))
+        if not matches and len(term) >= 3:
+            matches = list(self._fuzzy_matches(term))
+        matches = [(self._postings[token], quality) for token, quality in matches]
+        if len(term) <= SHORT_TERM_LENGTH:
+            # Best (exact, then shortest) completions until the budget is spent
+            matches.sort(key=lambda match: match[1], reverse=True)
+            hits = 0
+            for i, (posting, _) in enumerate(matches):
+                if hits >= MAX_SHORT_TERM_HITS:
+                    return matches[:i]
+                hits += len(posting)
+        return matches
+
+    def search(self, query, limit=20):
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        with self._lock:
+            # A full code typed with dashes/spaces ("PRD-20250101-AB12")
+            whole = "".join(terms)
+            if len(terms) > 1 and whole in self._postings:
+                terms = [whole]
+            terms = list(dict.fromkeys(terms))
+
+            per_term = [self._matches(term) for term in terms]
+            if not all(per_term):
+                return []
+
+            # Rarest term first: its hits are the only candidates, the other
+            # terms are probed per candidate instead of materialized
+            per_term.sort(key=lambda matches: sum(len(p) for p, _ in matches))
+
+            first, rest = per_term[0], per_term[1:]
+            if len(first) == 1 and first[0][1] == EXACT:
+                scores = dict(first[0][0])
+            else:
+                scores = {}
+                for posting, quality in first:
+                    for pid, weight in posting.items():
+                        score = weight * quality
+                        if scores.get(pid, 0) < score:
+                            scores[pid] = score
+
+            # Every term must match something (AND), scores add up
+            for matches in rest:
+                narrowed = {}
+                for pid, total in scores.items():
+                    best = 0
+                    for posting, quality in matches:
+                        weight = posting.get(pid)
+                        if weight is not None and weight * quality > best:
+                            best = weight * quality
+                    if best:
+                        narrowed[pid] = total + best
+                scores = narrowed
+                if not scores:
+                    return []
+
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [(self._docs[pid], round(score, 3)) for pid, score in top]
@@ -0,0 +1,110 @@
+"""
+EXPLAIN check for the hot endpoint queries.
+
+Runs EXPLAIN for the filters used by the dashboard, invoice listing, ledger and
+customer lookup endpoints and exits non-zero if any of them falls back to a
+full table scan. Run it against a database with representative data (on a
+near-empty table the optimizer may legitimately prefer a scan):
+
+    python query_plans.py
+"""
+import sys
+from datetime import datetime, timedelta
+
+from main import (
+    IST, LOW_STOCK_GAP, get_engine, new_session,
+    CustomerModel, InventoryTransaction, InvoiceModel, ProductModel,
+)
+
+
+def hot_queries(db):
+    now = datetime.now(IST)
+    start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    month_ago = now - timedelta(days=30)
+
+    return {
+        # get_dashboard_stats / hourly_sales_today
+        "paid_invoices_in_range": db.query(InvoiceModel.total).filter(
+            InvoiceModel.payment_status == "paid",
+            InvoiceModel.created_at >= start,
+            InvoiceModel.created_at < now,
+        ),
+        # get_invoices (status=paid, range=last30)
+        "invoices_by_status": db.query(InvoiceModel.id).filter(
+            InvoiceModel.payment_status == "paid",
+            InvoiceModel.created_at >= month_ago,
+        ).order_by(InvoiceModel.created_at.desc()).limit(10),
+        # get_invoices (no filters) / dashboard_activity
+        "latest_invoices": db.query(InvoiceModel.id)
+            .order_by(InvoiceModel.created_at.desc()).limit(10),
+        # dashboard_today / inventory_movement
+        "ledger_by_type": db.query(InventoryTransaction.quantity).filter(
+            InventoryTransaction.type == "OUT",
+            InventoryTransaction.created_at >= start,
+        ),
+        # get_inventory_transactions?product_id=
+        "ledger_by_product": db.query(InventoryTransaction.id).filter(
+            InventoryTransaction.product_id == "00000000-0000-0000-0000-000000000000",
+        ).order_by(InventoryTransaction.created_at.desc()).limit(30),
+        # search_customer_by_phone / create_invoice
+        "customer_by_phone": db.query(CustomerModel.id).filter(
+            CustomerModel.phone_normalized == "0000000000",
+        ),
+        # search_customers_by_phone_prefix
+        "customer_phone_prefix": db.query(CustomerModel.id).filter(
+            CustomerModel.phone_normalized >= "98765",
+            CustomerModel.phone_normalized < "98765:",
+        ).order_by(CustomerModel.phone_normalized).limit(10),
+        # get_customers keyset page
+        "customer_page": db.query(CustomerModel.id).filter(
+            (CustomerModel.name > "N") | ((CustomerModel.name == "N") & (CustomerModel.id > ""))
+        ).order_by(CustomerModel.name, CustomerModel.id).limit(51),
+        # low_stock_products / get_dashboard_stats
+        "low_stock": db.query(ProductModel.id).filter(LOW_STOCK_GAP <= 0),
+    }
+
+
+def _explain(db, query):
+    dialect = get_engine().dialect
+    compiled = query.statement.compile(dialect=dialect)
+    conn = db.connection()
+
+    if dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {compiled}",
+            tuple(compiled.params[key] for key in compiled.positiontup),
+        ).mappings().all()
+        return [r["detail"] for r in rows]
+
+    rows = conn.exec_driver_sql(f"EXPLAIN {compiled}", compiled.params).mappings().all()
+    return [f"{r['table']}: type={r['type']} key={r['key']}" for r in rows]
+
+
+def is_full_scan(plan_line):
+    if plan_line.startswith("SCAN "):          # SQLite
+        return "USING" not in plan_line
+    return " type=ALL " in plan_line + " "     # MySQL
+
+
+def check_plans():
+    db = new_session()
+    failures = []
+    try:
+        for name, query in hot_queries(db).items():
+            plan = _explain(db, query)
+            bad = [line for line in plan if is_full_scan(line)]
+            print(f"{'FAIL' if bad else 'ok':4}  {name}")
+            for line in plan:
+                print(f"      {line}")
+            if bad:
+                failures.append(name)
+    finally:
+        db.close()
+    return failures
+
+
+if __name__ == "__main__":
+    failed = check_plans()
+    if failed:
+        print(f"\nFull table scan in: {', '.join(failed)}")
+        sys.exit(1)
@@ -0,0 +1,64 @@
+"""
+Nightly daily-sales rollup into sales_daily.
+
+Rolls up every closed IST day (up to yesterday) not yet in sales_daily,
+grouped by created_day and payment_status, a chunk of days per transaction.
+/dashboard/sales/series reads rolled-up days from here and only the days
+after them from invoices; update_invoice_status moves totals between
+statuses on rolled-up days, so the rollup never has to be rebuilt for that.
+
+    python sales_rollup.py              # roll up days since the last run
+    python sales_rollup.py --rebuild    # recompute all history
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from main import IST, InvoiceModel, SalesDaily, get_engine, rollup_sales_days, sales_rolled_through
+from time_buckets import to_bucket
+
+logger = logging.getLogger("sales_rollup")
+
+CHUNK_DAYS = 31
+
+invoices = InvoiceModel.__table__
+rollup = SalesDaily.__table__
+
+
+def run(rebuild=False, chunk_days=CHUNK_DAYS):
+    started = time.perf_counter()
+    today = datetime.now(IST).date()
+
+    engine = get_engine()
+    with engine.begin() as conn:
+        if rebuild:
+            conn.execute(rollup.delete())
+        first_day = sales_rolled_through(conn)
+        if first_day is None:
+            first = conn.execute(select(func.min(invoices.c.created_day))).scalar()
+            if first is None:
+                logger.info("No invoices to roll up")
+                return 0
+            first_day = to_bucket(first).date()
+
+    days = 0
+    while first_day < today:
+        end_day = min(first_day + timedelta(days=chunk_days), today)
+        with engine.begin() as conn:
+            rollup_sales_days(conn, first_day, end_day)
+        days += (end_day - first_day).days
+        first_day = end_day
+
+    logger.info("Rolled up %d days of sales in %.2f s", days, time.perf_counter() - started)
+    return days
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roll closed days of invoices up into sales_daily")
+    parser.add_argument("--rebuild", action="store_true", help="recompute all history")
+    parser.add_argument("--chunk-days", type=int, default=CHUNK_DAYS, help="days per transaction")
+    args = parser.parse_args()
+    run(rebuild=args.rebuild, chunk_days=args.chunk_days)
@@ -0,0 +1,71 @@
+"""
+Barcode scan throughput: in-memory lookup index vs the database query.
+
+    python scan_benchmark.py                   # synthetic 50k-product index
+    python scan_benchmark.py --db --scans 2000 # also time DB lookups against DATABASE_URL
+"""
+import argparse
+import random
+import time
+
+from main import SCAN_COLUMNS, SCAN_ROWS, ProductModel, new_session
+from sku_index import ProductLookupIndex
+
+
+def synthetic_products(n):
+    return [
+        {
+            "id": f"id-{i}",
+            "product_code": f"PRD-20250101-{i:06d}",
+            "name": f"Product {i}",
+            "selling_price": 99.0,
+            "sku": f"SKU-{i:08X}",
+            "stock": i % 40,
+        }
+        for i in range(n)
+    ]
+
+
+def scans_per_second(lookup, codes):
+    start = time.perf_counter()
+    for code in codes:
+        lookup(code)
+    return len(codes) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare scan lookup paths")
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--scans", type=int, default=200000)
+    parser.add_argument("--db", action="store_true", help="also benchmark the database query")
+    args = parser.parse_args()
+
+    products = synthetic_products(args.products)
+    index = ProductLookupIndex()
+    index.load(products)
+
+    codes = [
+        random.choice(products)["sku" if i % 2 else "product_code"]
+        for i in range(args.scans)
+    ]
+    rate = scans_per_second(index.get, codes)
+    print(f"memory index: {rate:12,.0f} scans/s ({1e6 / rate:.2f} us/scan)")
+
+    if args.db:
+        db = new_session()
+        try:
+            rows = SCAN_ROWS.rows(db.query(*SCAN_COLUMNS).limit(1000).all())
+            if not rows:
+                print("database: no products to scan")
+            else:
+                db_codes = [random.choice(rows)["sku"] for _ in range(min(args.scans, 2000))]
+
+                def db_lookup(code):
+                    return db.query(*SCAN_COLUMNS).filter(
+                        (ProductModel.sku == code) | (ProductModel.product_code == code)
+                    ).first()
+
+                rate = scans_per_second(db_lookup, db_codes)
+                print(f"database:     {rate:12,.0f} scans/s ({1e6 / rate:.2f} us/scan)")
+        finally:
+            db.close()
@@ -0,0 +1,59 @@
+"""
+Product search latency on a synthetic catalog.
+
+    python search_benchmark.py                 # 50k products
+    python search_benchmark.py --products 100000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from product_search import ProductSearchIndex
+
+WORDS = (
+    "led bulb tube light panel strip fan ceiling wall lamp smart warm white cool "
+    "rgb decor chandelier spot flood street solar pendant batten downlight track "
+    "garden gate post bollard neon rope fairy string lantern torch emergency"
+).split()
+CATEGORIES = ["Lights", "Fans", "Decor", "Outdoor", "Industrial", "Festive"]
+QUERIES = [
+    "l", "le", "led", "led bul", "chandelir", "smart fan", "outdoor solar",
+    "prd-20250101-00042", "sku-0000002a", "warm white panel", "xyzzy",
+]
+
+
+def synthetic_catalog(n, seed=7):
+    rng = random.Random(seed)
+    brands = ["".join(rng.choices("abcdefghiklmnoprstuvy", k=rng.randint(4, 8))) for _ in range(2000)]
+    return [
+        {
+            "id": str(i),
+            "name": f"{rng.choice(brands)} {' '.join(rng.sample(WORDS, 3))} {rng.choice([5, 9, 12, 18, 24, 36])}w",
+            "sku": f"SKU-{i:08X}",
+            "product_code": f"PRD-20250101-{i:05d}",
+            "category_name": rng.choice(CATEGORIES),
+        }
+        for i in range(n)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time product search queries")
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    index = ProductSearchIndex()
+    start = time.perf_counter()
+    index.load(synthetic_catalog(args.products))
+    print(f"build: {time.perf_counter() - start:.2f} s for {args.products} products")
+
+    for query in QUERIES:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            results = index.search(query, 10)
+            timings.append((time.perf_counter() - start) * 1000)
+        p95 = sorted(timings)[int(len(timings) * 0.95) - 1]
+        print(f"{query!r:24} median {statistics.median(timings):6.3f} ms  p95 {p95:6.3f} ms  hits {len(results)}")
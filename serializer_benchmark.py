@@ -0,0 +1,105 @@
+"""
+Micro-benchmark: list serialization, old per-row path vs serializers.py.
+
+No database needed; rows are synthesized in memory.
+
+    python serializer_benchmark.py            # 20k rows
+    python serializer_benchmark.py --rows 50000
+"""
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from main import IST, Customer, CUSTOMER_ROWS, PRODUCT_ROWS
+from serializers import dumps
+
+
+def make_rows(n):
+    now = datetime.now(IST)
+    customers, products = [], []
+    for i in range(n):
+        created = now - timedelta(minutes=i)
+        customers.append((
+            str(uuid.uuid4()), f"Customer {i}", f"c{i}@example.com",
+            f"98{i:08d}", "12 MG Road, Pune", created,
+        ))
+        products.append((
+            str(uuid.uuid4()), f"PRD-20250101-{i:04d}", f"Product {i}", None,
+            str(uuid.uuid4()), "Lights",
+            199.0, 149.0, i % 50, 5,
+            f"SKU-{i:08X}", None, None,
+            f"/static/qr/{i}.png", created,
+        ))
+    return customers, products
+
+
+def old_customers(rows):
+    # ORM objects -> Pydantic per row -> response_model re-validation -> JSON
+    objs = [SimpleNamespace(**dict(zip(CUSTOMER_ROWS.fields, r))) for r in rows]
+    start = time.perf_counter()
+    result = [
+        Customer(
+            id=c.id, name=c.name, email=c.email, phone=c.phone,
+            address=c.address, created_at=c.created_at.isoformat(),
+        )
+        for c in objs
+    ]
+    validated = TypeAdapter(List[Customer]).validate_python(jsonable_encoder(result))
+    json.dumps(jsonable_encoder(validated)).encode()
+    return time.perf_counter() - start
+
+
+def old_products(rows):
+    # ORM objects -> dict per row with .isoformat() -> jsonable_encoder -> JSON
+    objs = [SimpleNamespace(**dict(zip(PRODUCT_ROWS.fields, r))) for r in rows]
+    start = time.perf_counter()
+    result = []
+    for p in objs:
+        result.append({
+            "id": p.id, "product_code": p.product_code, "name": p.name,
+            "description": p.description, "category_id": p.category_id,
+            "category_name": p.category_name,
+            "selling_price": p.selling_price, "min_selling_price": p.min_selling_price,
+            "stock": p.stock, "min_stock": p.min_stock,
+            "sku": p.sku, "image_url": p.image_url, "images": p.images or [],
+            "qr_code_url": p.qr_code_url, "created_at": p.created_at.isoformat(),
+        })
+    json.dumps(jsonable_encoder(result)).encode()
+    return time.perf_counter() - start
+
+
+def fast(serializer, rows):
+    start = time.perf_counter()
+    dumps(serializer.rows(rows))
+    return time.perf_counter() - start
+
+
+def best_of(fn, *args, repeat=5):
+    return min(fn(*args) for _ in range(repeat))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare list serialization paths")
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    customers, products = make_rows(args.rows)
+
+    for label, old, serializer, rows in [
+        ("customers", old_customers, CUSTOMER_ROWS, customers),
+        ("products", old_products, PRODUCT_ROWS, products),
+    ]:
+        t_old = best_of(old, rows)
+        t_new = best_of(fast, serializer, rows)
+        print(
+            f"{label:10} {args.rows} rows: "
+            f"per-row {t_old * 1000:8.1f} ms | tuples+orjson {t_new * 1000:7.1f} ms | "
+            f"{t_old / t_new:5.1f}x"
+        )
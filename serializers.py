@@ -0,0 +1,75 @@
+"""
+Fast JSON path for large list endpoints.
+
+Handlers query plain column tuples, zip them into dicts with a RowSerializer
+built once at import, and return a FastJSONResponse. Returning a Response
+directly skips FastAPI's response_model validation and jsonable_encoder pass,
+and datetimes are encoded by orjson (same ISO-8601 text as .isoformat())
+instead of per-row Python calls.
+
+orjson is optional: without it the stdlib json module is used.
+"""
+import json
+from datetime import date, datetime
+
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj, default=_default)
+
+    loads = orjson.loads
+else:
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+    loads = json.loads
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class RowSerializer:
+    """
+    Turns result tuples into dicts for a fixed list of field names.
+
+    `fields` are the output keys, in the same order as the selected columns.
+    `fixups` maps a field name to a function applied to that value (e.g. to
+    turn a NULL JSON column into []); fields without a fixup are passed through
+    untouched so the common case stays a single dict(zip(...)).
+    """
+
+    def __init__(self, fields, fixups=None):
+        self.fields = tuple(fields)
+        self.fixups = [
+            (self.fields.index(name), fn) for name, fn in (fixups or {}).items()
+        ]
+
+    def row(self, values):
+        if self.fixups:
+            values = list(values)
+            for i, fn in self.fixups:
+                values[i] = fn(values[i])
+        return dict(zip(self.fields, values))
+
+    def rows(self, rows):
+        if not self.fixups:
+            fields = self.fields
+            return [dict(zip(fields, r)) for r in rows]
+        return [self.row(r) for r in rows]
@@ -0,0 +1,61 @@
+"""
+In-process SKU / product_code lookup for the barcode scan path.
+
+Pure data structure: main.py loads it from the products table, keeps it
+fresh from change_log and falls back to the database on a miss.
+"""
+import threading
+
+
+class ProductLookupIndex:
+    """
+    Maps both `sku` and `product_code` to a product dict.
+
+    A SKU match wins over a product_code match, same as scanning a label
+    printed with the SKU. Entries are replaced wholesale on upsert, so readers
+    never see a half-updated product.
+    """
+
+    def __init__(self):
+        self._by_id = {}
+        self._by_sku = {}
+        self._by_code = {}
+        self._lock = threading.Lock()
+        self.ready = False
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def load(self, products):
+        by_id, by_sku, by_code = {}, {}, {}
+        for product in products:
+            by_id[product["id"]] = product
+            by_sku[product["sku"]] = product
+            by_code[product["product_code"]] = product
+
+        with self._lock:
+            self._by_id, self._by_sku, self._by_code = by_id, by_sku, by_code
+            self.ready = True
+
+    def upsert(self, product):
+        with self._lock:
+            self._discard(product["id"])
+            self._by_id[product["id"]] = product
+            self._by_sku[product["sku"]] = product
+            self._by_code[product["product_code"]] = product
+
+    def remove(self, product_id):
+        with self._lock:
+            self._discard(product_id)
+
+    def _discard(self, product_id):
+        old = self._by_id.pop(product_id, None)
+        if old is None:
+            return
+        if self._by_sku.get(old["sku"]) is old:
+            del self._by_sku[old["sku"]]
+        if self._by_code.get(old["product_code"]) is old:
+            del self._by_code[old["product_code"]]
+
+    def get(self, code):
+        return self._by_sku.get(code) or self._by_code.get(code)
@@ -0,0 +1,66 @@
+"""
+Startup budget check.
+
+Imports main in a fresh interpreter under `python -X importtime` and fails if
+the cumulative import time goes over budget, or if any module that should be
+loaded lazily (DB driver, bcrypt, jose, qrcode/PIL) is pulled in at import:
+
+    python startup_benchmark.py                 # default budget
+    python startup_benchmark.py --budget-ms 800
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+
+DEFAULT_BUDGET_MS = 1500
+LAZY_MODULES = ("pymysql", "passlib", "bcrypt", "jose", "qrcode", "PIL", "pandas", "openpyxl")
+
+
+def measure_import(module="main", runs=3):
+    """Return (best cumulative import time in ms, set of imported top-level modules)."""
+    best_us = None
+    imported = set()
+
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT_DIR,
+            env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr)
+
+        for line in proc.stderr.splitlines():
+            # "import time: self [us] | cumulative | imported package"
+            if not line.startswith("import time:") or "[us]" in line:
+                continue
+            _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+            imported.add(name.split(".")[0])
+            if name == module:
+                us = int(cumulative)
+                best_us = us if best_us is None else min(best_us, us)
+
+    return best_us / 1000, imported
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check main.py import time")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    elapsed_ms, imported = measure_import(runs=args.runs)
+    eager = sorted(set(LAZY_MODULES) & imported)
+
+    print(f"import main: {elapsed_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    if eager:
+        print(f"imported eagerly: {', '.join(eager)}")
+
+    if elapsed_ms > args.budget_ms or eager:
+        sys.exit(1)
@@ -0,0 +1,106 @@
+"""
+IST time buckets for chart queries.
+
+Timestamps are stored as IST wall-clock time (naive DATETIME), so a bucket
+is a plain truncation of `created_at`, no conversion. Invoices and
+inventory_transactions also carry `created_day`, a generated column equal
+to DATE(created_at) with covering indexes. Day/week/month series over
+whole days filter and group on it, so the database reads a contiguous
+index range instead of evaluating DATE() on every row.
+
+    bucket_column(model, granularity, dialect)  SQL expression, labelled "bucket"
+    range_filter(model, start, end)             [start, end) predicate
+    bucket_starts(start, end, granularity)      every bucket in the range
+    gap_fill(rows, start, end, granularity, width)  one row per bucket, zeros where empty
+
+Weeks start on Monday. Granularities: hour, day, week, month.
+"""
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import func
+
+GRANULARITIES = ("hour", "day", "week", "month")
+
+
+def _mysql(column, day, granularity):
+    if granularity == "hour":
+        return func.date_format(column, "%Y-%m-%d %H:00:00")
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return func.subdate(day, func.weekday(day))
+    return func.date_format(day, "%Y-%m-01")
+
+
+def _sqlite(column, day, granularity):
+    if granularity == "hour":
+        return func.strftime("%Y-%m-%d %H:00:00", column)
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        # On or after Sunday, back to that week's Monday
+        return func.date(day, "weekday 0", "-6 days")
+    return func.strftime("%Y-%m-01", day)
+
+
+def bucket_column(model, granularity, dialect):
+    """Bucket start of `model.created_at` (string or date, see to_bucket)."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    build = _sqlite if dialect == "sqlite" else _mysql
+    return build(model.created_at, model.created_day, granularity).label("bucket")
+
+
+def range_filter(model, start, end):
+    """[start, end) on created_day when both are midnights, else created_at."""
+    if start.time() == time.min and end.time() == time.min:
+        return (model.created_day >= start.date()) & (model.created_day < end.date())
+    return (model.created_at >= start) & (model.created_at < end)
+
+
+def floor(moment, granularity):
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = datetime.combine(moment.date(), time.min)
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def step(moment, granularity):
+    if granularity == "hour":
+        return moment + timedelta(hours=1)
+    if granularity == "day":
+        return moment + timedelta(days=1)
+    if granularity == "week":
+        return moment + timedelta(weeks=1)
+    return (moment.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def bucket_starts(start, end, granularity):
+    current = floor(start, granularity)
+    while current < end:
+        yield current
+        current = step(current, granularity)
+
+
+def to_bucket(value):
+    """Normalize a bucket value as returned by MySQL or SQLite to a datetime."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, time.min)
+    return datetime.fromisoformat(str(value))
+
+
+def gap_fill(rows, start, end, granularity, width):
+    """
+    rows: (bucket, *width values) from a query grouped by bucket_column.
+    Returns [(bucket start, values)] for every bucket in [start, end), zeros
+    where the query had no row.
+    """
+    found = {to_bucket(bucket): tuple(v or 0 for v in values) for bucket, *values in rows}
+    empty = (0,) * width
+    return [(moment, found.get(moment, empty)) for moment in bucket_starts(start, end, granularity)]